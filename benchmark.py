@@ -0,0 +1,256 @@
+"""无窗口的渲染性能基准测试
+
+使用SDL的dummy视频驱动在屏幕外运行Raycaster.render和实体渲染，
+迷宫、纹理和实体都使用固定的随机种子，玩家沿预先编排的路径移动，
+最后以JSON格式输出每个渲染阶段每帧耗时（毫秒）的百分位数。
+
+用法：python benchmark.py [--frames 300] [--output result.json]
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import math
+import platform
+import random
+import zlib
+from collections import deque
+
+import numpy as np
+import pygame
+
+from maze import Maze
+from player import Player
+from entity_pool import EntityPool
+from raycasting import Raycaster
+from profiler import Profiler
+
+def longest_path(maze, start):
+    """从起点出发做广度优先搜索，返回到最远通道单元格的路径"""
+    came_from = {start: None}
+    queue = deque([start])
+    current = start
+    while queue:
+        current = queue.popleft()
+        for dx, dy in [(0, -1), (1, 0), (0, 1), (-1, 0)]:
+            neighbor = (current[0] + dx, current[1] + dy)
+            if neighbor not in came_from and not maze.is_wall(*neighbor):
+                came_from[neighbor] = current
+                queue.append(neighbor)
+    
+    path = []
+    while current is not None:
+        path.append(current)
+        current = came_from[current]
+    return path[::-1]
+
+def corridor_walk(maze, start, frames, speed=0.05):
+    """沿迷宫中最长的路径行走，朝向始终指向下一个路径点"""
+    path = [(x + 0.5, y + 0.5) for x, y in longest_path(maze, start)]
+    poses = []
+    x, y = path[0]
+    angle = 0.0
+    target = 1
+    while len(poses) < frames:
+        if target < len(path):
+            tx, ty = path[target]
+            dx, dy = tx - x, ty - y
+            dist = math.hypot(dx, dy)
+            if dist <= speed:
+                x, y = tx, ty
+                target += 1
+            else:
+                angle = math.atan2(dy, dx)
+                x += dx / dist * speed
+                y += dy / dist * speed
+        else:
+            # 到达终点后原路返回
+            path.reverse()
+            target = 1
+        poses.append((x, y, angle))
+    return poses, []
+
+def spin(maze, start, frames):
+    """在起点原地旋转一周"""
+    x, y = start[0] + 0.5, start[1] + 0.5
+    return [(x, y, 2 * math.pi * i / frames) for i in range(frames)], []
+
+def sprite_closeup(maze, start, frames):
+    """三种实体从远处逐渐靠近玩家，直到几乎贴脸"""
+    x, y = start[0] + 0.5, start[1] + 0.5
+    
+    # 选择视野最开阔的方向
+    def free_distance(angle):
+        dist = 0.0
+        while dist < 20 and not maze.is_wall(x + math.cos(angle) * dist, y + math.sin(angle) * dist):
+            dist += 0.05
+        return dist
+    angle = max((i * math.pi / 2 for i in range(4)), key=free_distance)
+    far = max(1.0, free_distance(angle) - 0.5)
+    
+    poses = []
+    placements = []
+    for i in range(frames):
+        t = i / max(1, frames - 1)
+        dist = far + (0.4 - far) * t
+        frame_entities = []
+        for k in range(3):
+            # 三个实体前后错开，并向两侧稍微偏移
+            d = dist + k * 0.3
+            side = (k - 1) * 0.25
+            frame_entities.append((x + math.cos(angle) * d - math.sin(angle) * side,
+                                   y + math.sin(angle) * d + math.cos(angle) * side))
+        poses.append((x, y, angle))
+        placements.append(frame_entities)
+    return poses, placements
+
+SCENARIOS = {
+    'corridor_walk': corridor_walk,
+    'spin_360': spin,
+    'sprite_closeup': sprite_closeup
+}
+
+def percentiles(samples):
+    """计算耗时样本的统计信息"""
+    samples = np.asarray(samples)
+    return {
+        'mean': round(float(samples.mean()), 4),
+        'p50': round(float(np.percentile(samples, 50)), 4),
+        'p90': round(float(np.percentile(samples, 90)), 4),
+        'p99': round(float(np.percentile(samples, 99)), 4),
+        'max': round(float(samples.max()), 4)
+    }
+
+def run_scenario(name, args, workers=1):
+    """运行一个场景并返回各阶段的统计结果"""
+    # 每个场景都从相同的随机状态开始，保证迷宫、纹理和实体完全一致
+    random.seed(args.seed)
+    maze = Maze(args.maze_size, args.maze_size, algorithm=args.maze_algorithm)
+    profiler = Profiler(enabled=True, history_size=args.frames)
+    raycaster = Raycaster(maze, profiler)
+    raycaster.set_workers(workers)
+    if args.dynamic_resolution:
+        raycaster.enable_dynamic_resolution(args.dynamic_resolution)
+    
+    screen = pygame.display.get_surface()
+    start = min((x, y) for y in range(maze.height) for x in range(maze.width) if not maze.is_wall(x, y))
+    poses, placements = SCENARIOS[name](maze, start, args.frames + args.warmup)
+    
+    player = Player(poses[0][0], poses[0][1], maze)
+    entities = EntityPool(maze)
+    if placements:
+        for entity_type in EntityPool.type_names:
+            entities.add(0, 0, entity_type)
+    
+    # 荧光灯动画按帧推进，而不是使用真实时间，保证每次渲染的画面相同
+    frame_index = [0]
+    raycaster.time_source = lambda: frame_index[0] * 1000 // 60
+    checksum = 0
+    
+    for i, (x, y, angle) in enumerate(poses):
+        frame_index[0] = i
+        player.x, player.y, player.angle = x, y, angle
+        if placements:
+            for index, (ex, ey) in enumerate(placements[i]):
+                entities.place(index, ex, ey)
+        
+        with profiler.section('total'):
+            raycaster.render(screen, player, entities)
+        if i < args.warmup:
+            profiler.current.clear()
+        else:
+            profiler.end_frame()
+        
+        # 所有帧画面的校验和（不计入耗时），用于比较不同线程数的输出是否一致
+        checksum = zlib.crc32(pygame.surfarray.array3d(screen).tobytes(), checksum)
+    raycaster.set_workers(1)
+    
+    stages = {name: percentiles([frame.get(name, 0.0) for frame in profiler.frames])
+              for name in profiler.names()}
+    result = {
+        'frames': args.frames,
+        'stages': stages
+    }
+    result['fps_p50'] = round(1000 / max(result['stages']['total']['p50'], 1e-6), 1)
+    result['sprite_cache'] = raycaster.sprite_cache.stats()
+    result['ray_cache'] = raycaster.ray_cache_stats()
+    result['checksum'] = checksum
+    if raycaster.scaler is not None:
+        result['resolution'] = raycaster.scaler.stats()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='The Backrooms 无窗口渲染基准测试')
+    parser.add_argument('--width', type=int, default=800, help='渲染宽度')
+    parser.add_argument('--height', type=int, default=600, help='渲染高度')
+    parser.add_argument('--frames', type=int, default=300, help='每个场景计时的帧数')
+    parser.add_argument('--warmup', type=int, default=10, help='每个场景开始时不计时的帧数')
+    parser.add_argument('--seed', type=int, default=1234, help='随机种子')
+    parser.add_argument('--maze-size', type=int, default=21, help='迷宫边长')
+    parser.add_argument('--maze-algorithm', choices=sorted(Maze.generators), default='dfs', help='迷宫生成算法')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                        help='只运行指定场景（可重复指定）')
+    parser.add_argument('--dynamic-resolution', type=float, default=0, metavar='MS',
+                        help='以给定的每帧预算（毫秒）开启动态分辨率')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1], metavar='N',
+                        help='按列分块渲染的线程数，给出多个值时比较各线程数相对第一个值的加速比')
+    parser.add_argument('--output', help='把JSON结果写入文件而不是标准输出')
+    args = parser.parse_args()
+    
+    pygame.init()
+    pygame.display.set_mode((args.width, args.height))
+    
+    report = {
+        'config': {
+            'width': args.width,
+            'height': args.height,
+            'frames': args.frames,
+            'seed': args.seed,
+            'maze_size': args.maze_size,
+            'maze_algorithm': args.maze_algorithm,
+            'dynamic_resolution': args.dynamic_resolution,
+            'workers': args.workers
+        },
+        'machine': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'numpy': np.__version__,
+            'processor': platform.processor() or platform.machine(),
+            'cpu_count': os.cpu_count()
+        },
+        'scenarios': {}
+    }
+    names = args.scenario or list(SCENARIOS)
+    runs = {workers: {name: run_scenario(name, args, workers) for name in names}
+            for workers in args.workers}
+    baseline = runs[args.workers[0]]
+    report['scenarios'] = baseline
+    
+    # 多个线程数时报告加速比，并检查输出画面是否与基准一致
+    if len(args.workers) > 1:
+        report['parallel'] = {}
+        for workers, results in runs.items():
+            report['parallel'][str(workers)] = {
+                name: {
+                    'total_p50': result['stages']['total']['p50'],
+                    'speedup': round(baseline[name]['stages']['total']['p50'] /
+                                     max(result['stages']['total']['p50'], 1e-6), 3),
+                    'identical_output': result['checksum'] == baseline[name]['checksum']
+                }
+                for name, result in results.items()
+            }
+    
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+    
+    pygame.quit()
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,217 @@
+import math
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from maze import Maze
+
+class Chunk:
+    """无限迷宫中一个固定大小的区块"""
+    __slots__ = ('cells', 'textures', 'open_cells')
+    
+    def __init__(self, cells, textures, open_cells):
+        self.cells = cells  # 按行存放的单元格（1表示墙，0表示通道）
+        self.textures = textures  # 每个单元格的墙壁纹理索引
+        self.open_cells = open_cells  # 区块内通道单元格的局部序号
+
+class ChunkedMaze:
+    """无限大的后室：按种子逐块生成迷宫，在后台线程中预先生成玩家附近的区块，并按LRU淘汰远处的区块"""
+    endless = True
+    
+    def __init__(self, seed=None, chunk_size=16, load_radius=2, max_chunks=128, background=True, algorithm='dfs'):
+        if algorithm not in Maze.generators:
+            raise ValueError(f'未知的迷宫生成算法: {algorithm}')
+        self.seed = random.randrange(2 ** 32) if seed is None else seed  # 整个世界的种子
+        self.algorithm = algorithm  # 区块使用的生成算法（与Maze相同）
+        self.chunk_size = chunk_size  # 区块边长（必须为偶数，使奇数坐标的房间在区块之间对齐）
+        self.load_radius = load_radius  # 预先生成玩家周围多少圈区块
+        self.max_chunks = max(max_chunks, (2 * load_radius + 1) ** 2)  # 最多保留的区块数量
+        if chunk_size % 2:
+            raise ValueError('chunk_size必须为偶数')
+        
+        # 已生成的区块，按最近使用的顺序排列
+        self.chunks = OrderedDict()
+        self.lock = threading.Lock()
+        
+        # 每次载入或淘汰区块后递增，依赖网格的缓存据此判断是否需要重建
+        self.version = 0
+        
+        # 后台生成区块的线程，以及正在生成的区块
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chunks') if background else None
+        self.pending = {}
+        
+        # 区块统计
+        self.generated = 0
+        self.evictions = 0
+        
+        # 先同步生成原点附近的区块
+        self.update(chunk_size / 2, chunk_size / 2)
+    
+    def _chunk_seed(self, cx, cy):
+        """区块的随机种子只由世界种子和区块坐标决定，淘汰后重新生成的区块与原来完全相同"""
+        return (self.seed * 1000003 ^ (cx & 0xFFFFFFFF) * 73856093 ^ (cy & 0xFFFFFFFF) * 19349663) & 0xFFFFFFFFFFFF
+    
+    def _generate_chunk(self, cx, cy):
+        """使用与普通迷宫相同的生成算法生成一个区块，并在左边和上边的边界上开门与相邻区块连通"""
+        size = self.chunk_size
+        rng = random.Random(self._chunk_seed(cx, cy))
+        
+        # 房间位于局部奇数坐标上（区块边长为偶数，因此也是全局奇数坐标），
+        # 左边和上边的第0列、第0行是与相邻区块之间的墙，由本区块负责开门；
+        # 在多一行一列的网格上生成，使最右、最下的房间也在迷宫内部，多出的行列属于相邻区块，生成后丢弃
+        scratch = bytearray(b'\x01') * ((size + 1) * (size + 1))
+        Maze.carve(scratch, size + 1, size + 1, self.algorithm, rng)
+        cells = bytearray(np.frombuffer(scratch, dtype=np.uint8).reshape(size + 1, size + 1)[:size, :size].tobytes())
+        
+        # 与左边和上边的区块各打通一到两扇门
+        rooms = list(range(1, size, 2))
+        for y in rng.sample(rooms, rng.randint(1, 2)):
+            cells[y * size] = 0
+        for x in rng.sample(rooms, rng.randint(1, 2)):
+            cells[x] = 0
+        
+        grid = np.frombuffer(cells, dtype=np.uint8).reshape(size, size)
+        textures = bytearray(Maze.wall_materials(grid, np.random.default_rng(self._chunk_seed(cx, cy))).tobytes())
+        open_cells = [i for i in range(size * size) if cells[i] == 0]
+        return Chunk(cells, textures, open_cells)
+    
+    def _store_chunk(self, key, chunk):
+        """把生成好的区块加入缓存"""
+        with self.lock:
+            self.pending.pop(key, None)
+            if key not in self.chunks:
+                self.chunks[key] = chunk
+                self.generated += 1
+                self.version += 1
+    
+    def _load_in_background(self, key):
+        """在后台线程中生成区块"""
+        self._store_chunk(key, self._generate_chunk(*key))
+    
+    def chunk_key(self, x, y):
+        """坐标所在区块的坐标"""
+        return math.floor(x) // self.chunk_size, math.floor(y) // self.chunk_size
+    
+    def update(self, x, y):
+        """根据玩家位置载入附近的区块并淘汰最久未使用的区块，每帧调用一次"""
+        center_x, center_y = self.chunk_key(x, y)
+        nearby = [(center_x + dx, center_y + dy)
+                  for dy in range(-self.load_radius, self.load_radius + 1)
+                  for dx in range(-self.load_radius, self.load_radius + 1)]
+        
+        missing = []
+        with self.lock:
+            for key in nearby:
+                if key in self.chunks:
+                    self.chunks.move_to_end(key)
+                elif key not in self.pending:
+                    missing.append(key)
+        
+        for key in missing:
+            if self.executor is None or (abs(key[0] - center_x) <= 1 and abs(key[1] - center_y) <= 1):
+                # 玩家所在及相邻的区块必须立即可用
+                self._store_chunk(key, self._generate_chunk(*key))
+            else:
+                # 在锁内提交，保证后台线程存入区块时pending中已有对应的项
+                with self.lock:
+                    self.pending[key] = self.executor.submit(self._load_in_background, key)
+        
+        # 淘汰最久未使用的区块（玩家附近的区块始终保留）
+        nearby = set(nearby)
+        with self.lock:
+            while len(self.chunks) > self.max_chunks:
+                key = next(iter(self.chunks))
+                if key in nearby:
+                    break
+                del self.chunks[key]
+                self.evictions += 1
+                self.version += 1
+    
+    def is_wall(self, x, y):
+        """检查给定坐标是否是墙（尚未生成的区块视为墙）"""
+        x = math.floor(x)
+        y = math.floor(y)
+        chunk = self.chunks.get((x // self.chunk_size, y // self.chunk_size))
+        if chunk is None:
+            return True
+        return chunk.cells[(y % self.chunk_size) * self.chunk_size + x % self.chunk_size] == 1
+    
+    def cells_visible(self, x1, y1, x2, y2):
+        """无限迷宫不预计算可见集，总是返回True，由调用者做精确检测"""
+        return True
+    
+    def get_wall_texture_index(self, x, y):
+        """获取墙壁的纹理索引（材质），尚未生成的区块返回0"""
+        x = math.floor(x)
+        y = math.floor(y)
+        chunk = self.chunks.get((x // self.chunk_size, y // self.chunk_size))
+        if chunk is None:
+            return 0
+        return chunk.textures[(y % self.chunk_size) * self.chunk_size + x % self.chunk_size]
+    
+    def _region(self, x0, y0, width, height, attribute, fill):
+        """把区块中的数据拼接成以 (x0, y0) 为左上角的数组，未生成的区块用fill填充"""
+        size = self.chunk_size
+        region = np.full((height, width), fill, dtype=np.uint8)
+        for cy in range(y0 // size, (y0 + height - 1) // size + 1):
+            for cx in range(x0 // size, (x0 + width - 1) // size + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk is None:
+                    continue
+                data = np.frombuffer(getattr(chunk, attribute), dtype=np.uint8).reshape(size, size)
+                left = max(x0, cx * size)
+                right = min(x0 + width, (cx + 1) * size)
+                top = max(y0, cy * size)
+                bottom = min(y0 + height, (cy + 1) * size)
+                region[top - y0:bottom - y0, left - x0:right - x0] = \
+                    data[top - cy * size:bottom - cy * size, left - cx * size:right - cx * size]
+        return region
+    
+    def get_region(self, x0, y0, width, height):
+        """获取以 (x0, y0) 为左上角的网格窗口，形状为 (高, 宽)，未生成的区块视为墙"""
+        return self._region(x0, y0, width, height, 'cells', 1)
+    
+    def get_texture_region(self, x0, y0, width, height):
+        """获取与get_region相同窗口内的墙壁纹理索引"""
+        return self._region(x0, y0, width, height, 'textures', 0)
+    
+    def _random_open_cell(self, chunks):
+        """从给定区块中随机选择一个通道单元格，返回其全局坐标"""
+        (cx, cy), chunk = random.choice(chunks)
+        index = random.choice(chunk.open_cells)
+        return cx * self.chunk_size + index % self.chunk_size, cy * self.chunk_size + index // self.chunk_size
+    
+    def get_random_empty_position(self):
+        """在已生成的区块中随机获取一个空位置"""
+        with self.lock:
+            chunks = [(key, chunk) for key, chunk in self.chunks.items() if chunk.open_cells]
+        return self._random_open_cell(chunks)
+    
+    def get_random_empty_position_far_from(self, x, y, min_distance, attempts=32):
+        """在已生成的区块中随机获取一个与 (x, y) 的距离大于min_distance的空位置，找不到时返回None"""
+        with self.lock:
+            chunks = [(key, chunk) for key, chunk in self.chunks.items() if chunk.open_cells]
+        for _ in range(attempts):
+            cell_x, cell_y = self._random_open_cell(chunks)
+            if math.hypot(cell_x - x, cell_y - y) > min_distance:
+                return (cell_x, cell_y)
+        return None
+    
+    def stats(self):
+        """获取区块缓存的统计信息"""
+        return {
+            'chunks': len(self.chunks),
+            'pending': len(self.pending),
+            'generated': self.generated,
+            'evictions': self.evictions,
+            'bytes': len(self.chunks) * 2 * self.chunk_size * self.chunk_size
+        }
+    
+    def close(self):
+        """停止后台生成线程"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
\ No newline at end of file
@@ -0,0 +1,302 @@
+import math
+import random
+
+import numpy as np
+
+from pathfinding import PathFinder
+from spatial_hash import SpatialHash
+
+CRAWLER = 0
+WATCHER = 1
+HUNTER = 2
+
+class EntityPool:
+    """结构数组（SoA）形式的实体集合：位置、朝向、速度、检测范围、类型和计时器各自存放在NumPy数组中，
+    每帧用少量向量化操作更新所有实体"""
+    
+    type_names = ('crawler', 'watcher', 'hunter')  # 类型编号对应的名称
+    type_speeds = (0.015, 0.02, 0.03)  # 各类型的移动速度
+    type_ranges = (4.0, 7.0, 6.0)  # 各类型检测玩家的范围
+    type_textures = (0, 1, 2)  # 各类型的纹理索引
+    
+    # 上、右、下、左四个方向的单元格偏移
+    directions_x = np.array([0, 1, 0, -1])
+    directions_y = np.array([-1, 0, 1, 0])
+    
+    def __init__(self, maze, flow_field=None, path_finder=None, capacity=64):
+        self.maze = maze  # 迷宫引用
+        self.flow_field = flow_field  # 共享的朝向玩家的距离场
+        self.path_finder = path_finder if path_finder is not None else PathFinder(maze)  # 超出距离场范围时的A*寻路
+        self.count = 0  # 实体数量（数组中前count项有效）
+        
+        self.sight_step = 0.1  # 视线检测的步长
+        self.path_update_interval = 30  # 每30帧更新一次A*路径
+        self.window_radius = 48  # 无限迷宫中参与碰撞检测的窗口半径（窗口外的实体暂停移动）
+        self.awareness_radius = max(self.type_ranges) * 1.5  # 只有这个范围内的实体才计算视线和追踪
+        
+        # 按单元格分桶的实体空间哈希，用于抓捕检测、感知范围查询和精灵剔除
+        self.spatial_hash = SpatialHash(capacity)
+        
+        # 沿A*路径追踪玩家的猎手：实体序号 -> 剩余路径点
+        self.paths = {}
+        
+        # 游荡时选择方向的随机数生成器（由全局random决定，random.seed()可以复现）
+        self.rng = np.random.default_rng(random.randrange(2 ** 32))
+        
+        self._allocate(capacity)
+    
+    def _allocate(self, capacity):
+        """分配（或扩容）各属性数组，保留已有实体的数据"""
+        def grow(name, dtype, fill=0):
+            array = np.full(capacity, fill, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                array[:self.count] = old[:self.count]
+            setattr(self, name, array)
+        
+        grow('x', np.float64)  # 实体X坐标
+        grow('y', np.float64)  # 实体Y坐标
+        grow('angle', np.float64)  # 朝向
+        grow('speed', np.float64)  # 移动速度
+        grow('detection_range', np.float64)  # 检测玩家的范围
+        grow('types', np.int8)  # 实体类型编号
+        grow('texture_index', np.intp)  # 纹理索引
+        grow('path_timer', np.int32)  # A*路径更新计时器
+        grow('heading', np.int8)  # 游荡时的前进方向（四个方向之一）
+        grow('target_x', np.int64, -(1 << 40))  # 游荡时前往的单元格（初始值保证与任何单元格都不相邻）
+        grow('target_y', np.int64, -(1 << 40))
+        self.capacity = capacity
+    
+    def __len__(self):
+        return self.count
+    
+    def add(self, x, y, entity_type):
+        """添加一个实体，返回其序号"""
+        if self.count == self.capacity:
+            self._allocate(self.capacity * 2)
+        kind = self.type_names.index(entity_type)
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.angle[i] = random.uniform(0, 2 * math.pi)  # 随机初始朝向
+        self.speed[i] = self.type_speeds[kind]
+        self.detection_range[i] = self.type_ranges[kind]
+        self.types[i] = kind
+        self.texture_index[i] = self.type_textures[kind]
+        self.heading[i] = random.randrange(4)
+        self.spatial_hash.insert(i, x, y)
+        self.count += 1
+        return i
+    
+    def place(self, index, x, y):
+        """把实体直接放到指定位置（用于基准测试等由外部控制位置的场景）"""
+        self.x[index] = x
+        self.y[index] = y
+        self.spatial_hash.move([index], [x], [y])
+    
+    def positions(self):
+        """所有实体的X、Y坐标数组（视图）"""
+        return self.x[:self.count], self.y[:self.count]
+    
+    def texture_indices(self):
+        """所有实体的纹理索引数组（视图）"""
+        return self.texture_index[:self.count]
+    
+    def within(self, x, y, radius):
+        """与点 (x, y) 的距离小于radius的实体序号数组"""
+        return self.spatial_hash.within(x, y, radius)
+    
+    def in_cell(self, cell_x, cell_y):
+        """位于单元格内的实体序号数组"""
+        return self.spatial_hash.in_cell(cell_x, cell_y)
+    
+    def caught(self, player, radius=0.5):
+        """是否有实体与玩家的距离小于radius（只检查玩家附近单元格中的实体）"""
+        return len(self.spatial_hash.within(player.x, player.y, radius)) > 0
+    
+    def _grid(self, player):
+        """碰撞检测使用的网格及其左上角的世界坐标"""
+        if self.maze.endless:
+            radius = self.window_radius
+            origin = (math.floor(player.x) - radius, math.floor(player.y) - radius)
+            return self.maze.get_region(origin[0], origin[1], 2 * radius + 1, 2 * radius + 1), origin
+        return self.maze.array, (0, 0)
+    
+    def _walls(self, grid, origin, x, y):
+        """坐标数组所在的单元格是否是墙（网格外视为墙）"""
+        cell_x = np.floor(x).astype(np.intp) - origin[0]
+        cell_y = np.floor(y).astype(np.intp) - origin[1]
+        inside = (cell_x >= 0) & (cell_x < grid.shape[1]) & (cell_y >= 0) & (cell_y < grid.shape[0])
+        walls = np.ones(np.shape(x), dtype=bool)
+        walls[inside] = grid[cell_y[inside], cell_x[inside]] == 1
+        return walls
+    
+    def update(self, player):
+        """更新所有实体：计算距离和视线，然后按类型向玩家移动、沿距离场追踪或在走廊中游荡"""
+        n = self.count
+        if not n:
+            return
+        grid, origin = self._grid(player)
+        types = self.types[:n]
+        
+        # 只有玩家附近的实体可能看见或追踪玩家，通过空间哈希取出，其余实体直接游荡
+        near = self.spatial_hash.within(player.x, player.y, self.awareness_radius)
+        x, y = self.x[near], self.y[near]
+        near_types = types[near]
+        speed = self.speed[near]
+        detection_range = self.detection_range[near]
+        
+        # 与玩家的距离和朝向玩家的单位向量
+        dx = player.x - x
+        dy = player.y - y
+        dist = np.hypot(dx, dy)
+        safe = np.where(dist > 0, dist, 1.0)
+        unit_x = np.where(dist > 0, dx / safe, 0.0)
+        unit_y = np.where(dist > 0, dy / safe, 0.0)
+        seen = self._can_see(grid, origin, player, x, y, unit_x, unit_y, dist, detection_range)
+        
+        # 看见玩家的实体面向玩家
+        self.angle[near[seen]] = np.arctan2(dy, dx)[seen]
+        
+        # 爬行者和猎手看见玩家时直接向玩家移动；观察者只在玩家非常接近时移动
+        direct = seen & ((near_types != WATCHER) | (dist < detection_range * 0.5))
+        new_x = x + unit_x * speed
+        new_y = y + unit_y * speed
+        blocked = self._walls(grid, origin, new_x, new_y)
+        
+        # 爬行者可以穿过墙壁，但速度减半
+        crawling = direct & blocked & (near_types == CRAWLER)
+        moving = direct & ~blocked
+        x[moving] = new_x[moving]
+        y[moving] = new_y[moving]
+        x[crawling] += unit_x[crawling] * speed[crawling] * 0.5
+        y[crawling] += unit_y[crawling] * speed[crawling] * 0.5
+        moved = moving | crawling
+        self.x[near[moved]] = x[moved]
+        self.y[near[moved]] = y[moved]
+        self.spatial_hash.move(near[moved], x[moved], y[moved])
+        
+        # 猎手在扩展检测范围内但看不到玩家时追踪玩家
+        self.path_timer[:n] += 1
+        pursuing = (near_types == HUNTER) & ~seen & (dist <= detection_range * 1.5)
+        pursued = self._pursue(grid, origin, player, near[pursuing])
+        for i in set(self.paths) - set(pursued.tolist()):
+            del self.paths[i]
+        
+        # 其余的爬行者和猎手在走廊中游荡（观察者在未检测到玩家时不移动）
+        roaming = types != WATCHER
+        roaming[near[seen]] = False
+        roaming[pursued] = False
+        self._roam(grid, origin, np.flatnonzero(roaming))
+    
+    def _can_see(self, grid, origin, player, x, y, unit_x, unit_y, dist, detection_range):
+        """检测范围内的实体沿直线以固定步长采样到玩家之间的单元格，全部不是墙时能看见玩家"""
+        seen = np.zeros(len(x), dtype=bool)
+        candidates = np.flatnonzero(dist <= detection_range)
+        if not self.maze.endless:
+            # 先用迷宫的可见集排除不可能看见的实体，只对可能看见的实体做射线检测
+            candidates = candidates[[self.maze.cells_visible(x[i], y[i], player.x, player.y)
+                                     for i in candidates.tolist()]]
+        if not len(candidates):
+            return seen
+        steps = (dist[candidates] / self.sight_step).astype(np.intp)
+        samples = np.arange(1, int(steps.max()) + 1)
+        offsets = samples * self.sight_step
+        sample_x = x[candidates, None] + unit_x[candidates, None] * offsets
+        sample_y = y[candidates, None] + unit_y[candidates, None] * offsets
+        blocked = self._walls(grid, origin, sample_x, sample_y) & (samples <= steps[:, None])
+        seen[candidates] = ~blocked.any(axis=1)
+        return seen
+    
+    def _pursue(self, grid, origin, player, indices):
+        """沿共享距离场（超出范围时沿A*路径）朝玩家走一步，返回实际追踪的实体序号"""
+        if not len(indices):
+            return indices
+        target_x = np.zeros(len(indices))
+        target_y = np.zeros(len(indices))
+        valid = np.zeros(len(indices), dtype=bool)
+        if self.flow_field is not None:
+            target_x, target_y, valid = self.flow_field.next_steps(self.x[indices], self.y[indices])
+        
+        # 距离场无法到达的少数猎手各自使用A*路径
+        for k in np.flatnonzero(~valid).tolist():
+            i = int(indices[k])
+            path = self.paths.get(i)
+            if path is None or not path or self.path_timer[i] >= self.path_update_interval:
+                path = self.paths[i] = self.path_finder.find_path(self.x[i], self.y[i], player.x, player.y)
+                self.path_timer[i] = 0
+            if path and math.hypot(path[0][0] - self.x[i], path[0][1] - self.y[i]) < 0.1:
+                path.pop(0)  # 已经接近路径点
+            if path:
+                target_x[k], target_y[k] = path[0]
+                valid[k] = True
+        
+        indices = indices[valid]
+        self._step_towards(grid, origin, indices, target_x[valid], target_y[valid], self.speed[indices], True)
+        return indices
+    
+    def _roam(self, grid, origin, indices):
+        """沿走廊前进，在路口随机选择不回头的方向，在死胡同掉头，因此实体总是从一个路口走到相邻的路口"""
+        if not len(indices):
+            return
+        x, y = self.x[indices], self.y[indices]
+        cell_x = np.floor(x).astype(np.int64)
+        cell_y = np.floor(y).astype(np.int64)
+        target_x, target_y = self.target_x[indices], self.target_y[indices]
+        
+        # 到达目标单元格中心，或目标与当前单元格不相邻（例如追逐玩家之后）时选择新的目标
+        arrived = (x == target_x + 0.5) & (y == target_y + 0.5)
+        stale = np.abs(target_x - cell_x) + np.abs(target_y - cell_y) > 1
+        in_wall = self._walls(grid, origin, x, y)
+        choose = (arrived | stale) & ~in_wall
+        if choose.any():
+            chosen = np.flatnonzero(choose)
+            around_x = cell_x[chosen, None] + self.directions_x
+            around_y = cell_y[chosen, None] + self.directions_y
+            open_sides = ~self._walls(grid, origin, around_x + 0.5, around_y + 0.5)
+            
+            # 刚到达单元格中心的实体不回头，除非只能回头
+            heading = self.heading[indices[chosen]].astype(np.intp)
+            allowed = open_sides.copy()
+            allowed[np.flatnonzero(arrived[chosen]), (heading[arrived[chosen]] + 2) % 4] = False
+            dead_end = ~allowed.any(axis=1)
+            allowed[dead_end] = open_sides[dead_end]
+            
+            # 在允许的方向中均匀随机选择一个
+            weights = self.rng.random(allowed.shape) * allowed
+            direction = weights.argmax(axis=1)
+            has_way = allowed.any(axis=1)
+            chosen, direction = chosen[has_way], direction[has_way]
+            self.heading[indices[chosen]] = direction
+            target_x[chosen] = cell_x[chosen] + self.directions_x[direction]
+            target_y[chosen] = cell_y[chosen] + self.directions_y[direction]
+            self.target_x[indices] = target_x
+            self.target_y[indices] = target_y
+        
+        # 朝目标单元格中心移动，随机移动速度较慢；卡在墙里的爬行者直接穿墙返回目标单元格
+        has_target = np.abs(target_x - cell_x) + np.abs(target_y - cell_y) <= 1
+        indices = indices[has_target]
+        self._step_towards(grid, origin, indices, target_x[has_target] + 0.5, target_y[has_target] + 0.5,
+                           self.speed[indices] * 0.5, False)
+    
+    def _step_towards(self, grid, origin, indices, target_x, target_y, speed, collide):
+        """朝目标点移动一步（不越过目标点）并面向目标，collide为True时不进入墙壁"""
+        if not len(indices):
+            return
+        x, y = self.x[indices], self.y[indices]
+        dx = target_x - x
+        dy = target_y - y
+        dist = np.hypot(dx, dy)
+        safe = np.where(dist > 0, dist, 1.0)
+        arrive = dist <= speed
+        new_x = np.where(arrive, target_x, x + dx / safe * speed)
+        new_y = np.where(arrive, target_y, y + dy / safe * speed)
+        if collide:
+            free = ~self._walls(grid, origin, new_x, new_y)
+            new_x = np.where(free, new_x, x)
+            new_y = np.where(free, new_y, y)
+        self.x[indices] = new_x
+        self.y[indices] = new_y
+        self.spatial_hash.move(indices, new_x, new_y)
+        moving = dist > 0
+        self.angle[indices[moving]] = np.arctan2(dy[moving], dx[moving])
\ No newline at end of file
@@ -0,0 +1,210 @@
+import math
+import random
+
+import numpy as np
+import pygame
+
+from fog import FogTable
+from texture_store import TextureStore
+
+class FloorCaster:
+    """逐行向量化投射地板和天花板，从固定在迷宫网格上的地毯和天花板纹理中采样"""
+    
+    def __init__(self, fov, max_depth, fog_color, wall_scale=0.8, texels_per_cell=64, fog_levels=32):
+        self.fov = fov  # 视场角
+        self.half_fov = fov / 2
+        self.max_depth = max_depth  # 雾完全覆盖时的距离
+        self.wall_scale = wall_scale  # 与墙壁投影一致：墙壁高度 = 屏幕高度 * wall_scale / 距离
+        self.texels_per_cell = texels_per_cell  # 每个迷宫单元格对应的纹素数
+        
+        # 每张纹理覆盖2x2个单元格（边长为2的幂，采样时用位运算取模）
+        self.texture_size = texels_per_cell * 2
+        self.store = TextureStore(np.stack([
+            pygame.surfarray.array3d(self._create_carpet_texture()),
+            pygame.surfarray.array3d(self._create_ceiling_texture())
+        ]))
+        
+        # 每个mipmap等级的雾效果查找表，形状为 (2, 雾等级, 宽, 高, 3)
+        self.fog = FogTable(fog_color, max_depth, levels=fog_levels)
+        for level, textures in enumerate(self.store.levels):
+            self.fog.add(f'planes.{level}', textures)
+        
+        # 按像素格式打包成整数的查找表，形状为 (2, 雾等级 * 宽 * 高)
+        self.packed_format = None
+        self.packed = []
+        
+        # 按分辨率缓存的逐行、逐列参数
+        self.size = None
+        self.column_tans = None
+        self.row_groups = None
+        
+        # 每帧复用的坐标缓冲区，避免每帧分配大数组
+        self.coords = None
+        self.texel_x = None
+        self.texel_y = None
+    
+    def _create_carpet_texture(self):
+        """创建潮湿的黄褐色地毯纹理"""
+        size = self.texels_per_cell
+        tile = pygame.Surface((size, size))
+        tile.fill((200, 185, 135))
+        
+        # 地毯的绒毛噪点
+        for _ in range(400):
+            x = random.randint(0, size - 1)
+            y = random.randint(0, size - 1)
+            shade = random.randint(-18, 12)
+            pygame.draw.rect(tile, (200 + shade, 185 + shade, 135 + shade), (x, y, 2, 2))
+        
+        texture = pygame.Surface((self.texture_size, self.texture_size))
+        for x in range(0, self.texture_size, size):
+            for y in range(0, self.texture_size, size):
+                texture.blit(tile, (x, y))
+        
+        # 其中一个单元格带有水渍
+        for _ in range(3):
+            x = random.randint(size + 8, 2 * size - 20)
+            y = random.randint(8, size - 20)
+            pygame.draw.ellipse(texture, (188, 172, 122), (x, y, random.randint(6, 12), random.randint(5, 10)))
+        
+        return texture
+    
+    def _create_ceiling_texture(self):
+        """创建天花板吊顶纹理，每2x2个单元格中有一个荧光灯"""
+        size = self.texels_per_cell
+        tile_size = size // 2  # 每个单元格有2x2块吊顶板
+        texture = pygame.Surface((self.texture_size, self.texture_size))
+        texture.fill((232, 230, 218))
+        
+        # 吊顶板上的细小孔洞
+        for _ in range(300):
+            x = random.randint(0, self.texture_size - 1)
+            y = random.randint(0, self.texture_size - 1)
+            texture.set_at((x, y), (215, 212, 198))
+        
+        # 吊顶板之间的龙骨
+        for i in range(0, self.texture_size, tile_size):
+            pygame.draw.line(texture, (200, 198, 185), (i, 0), (i, self.texture_size - 1))
+            pygame.draw.line(texture, (200, 198, 185), (0, i), (self.texture_size - 1, i))
+        
+        # 荧光灯占据第一个单元格中间的两块吊顶板
+        light_rect = pygame.Rect(tile_size // 2, 2, tile_size, size - 4)
+        pygame.draw.rect(texture, (250, 250, 240), light_rect.inflate(4, 4))
+        pygame.draw.rect(texture, (255, 255, 255), light_rect)
+        
+        return texture
+    
+    def _build(self, size):
+        """为给定分辨率预计算每列的视线偏移和每行的距离、雾等级与mipmap等级"""
+        screen_width, screen_height = size
+        self.size = size
+        
+        # 每列光线相对视线的偏移角的正切，地板坐标 = 玩家位置 + 行距离 * (前方 + 正切 * 右方)
+        offsets = -self.half_fov + (np.arange(screen_width) + 0.5) * self.fov / screen_width
+        self.column_tans = np.tan(offsets).astype(np.float32)
+        
+        # 距地平线第p行（取像素中心）对应的垂直距离，天花板和地板关于地平线对称
+        rows = max(1, screen_height)
+        distances = (screen_height * self.wall_scale / 2) / (np.arange(rows) + 0.5)
+        
+        # 一张纹理（2个单元格宽）投影到屏幕上的宽度决定mipmap等级，距离单调递减，因此等级按行连续分组
+        projected = 2 * screen_width / (2 * math.tan(self.half_fov) * distances)
+        mip_levels = self.store.level_for(projected)
+        self.row_groups = []
+        edges = np.flatnonzero(np.diff(mip_levels)) + 1
+        for start, end in zip(np.concatenate(([0], edges)), np.concatenate((edges, [rows]))):
+            level = int(mip_levels[start])
+            mip_size = self.store.level_size(level)[0]
+            
+            # 每行距离直接换算为该等级的纹素数，每行的雾等级换算为查找表中的偏移
+            texels = (distances[start:end] * self.texels_per_cell / (1 << level)).astype(np.float32)
+            fog_levels = self.fog.bucket(f'planes.{level}', distances[start:end])
+            fog_offsets = (fog_levels * mip_size * mip_size).astype(np.int32)
+            self.row_groups.append((int(start), int(end), level, texels, fog_offsets))
+        
+        self.coords = np.empty((rows, screen_width), dtype=np.float32)
+        self.texel_x = np.empty((rows, screen_width), dtype=np.int32)
+        self.texel_y = np.empty((rows, screen_width), dtype=np.int32)
+    
+    def _pack(self, surface):
+        """把雾效果查找表打包成与表面像素格式一致的整数"""
+        packed_format = (surface.get_bytesize(), surface.get_shifts(), surface.get_masks())
+        if packed_format == self.packed_format:
+            return
+        self.packed_format = packed_format
+        self.packed = []
+        for level in range(len(self.store.levels)):
+            table = self.fog.tables[f'planes.{level}']
+            if surface.get_bytesize() == 4:
+                table = TextureStore.map_colors(surface, table)
+                self.packed.append(table.reshape(table.shape[0], -1))
+            else:
+                self.packed.append(table.reshape(table.shape[0], -1, 3))
+    
+    def draw(self, screen, x, y, angle, bob_offset, skip_rows=0):
+        """把地板和天花板绘制到屏幕上（墙壁随后覆盖在上面），跳过地平线上下已知会被墙壁覆盖的skip_rows行"""
+        if screen.get_size() != self.size:
+            self._build(screen.get_size())
+        self._pack(screen)
+        screen_width, screen_height = self.size
+        horizon = min(max(screen_height // 2 + bob_offset, 0), screen_height)
+        floor_rows = screen_height - horizon
+        ceiling_rows = horizon
+        
+        # 每列的世界坐标方向（未归一化，与行距离相乘即得到地板坐标），以纹素为单位
+        cos_p = math.cos(angle)
+        sin_p = math.sin(angle)
+        direction_x = cos_p - sin_p * self.column_tans
+        direction_y = sin_p + cos_p * self.column_tans
+        
+        # 按 (行, 列) 访问帧缓冲区，使每一行在内存中连续
+        if screen.get_bytesize() == 4:
+            frame = pygame.surfarray.pixels2d(screen).T
+        else:
+            frame = pygame.surfarray.pixels3d(screen).transpose(1, 0, 2)
+        
+        for start, end, level, texels, fog_offsets in self.row_groups:
+            end = min(end, max(floor_rows, ceiling_rows))
+            if end <= start:
+                break
+            if end <= skip_rows:
+                continue
+            if start < skip_rows:
+                texels = texels[skip_rows - start:]
+                fog_offsets = fog_offsets[skip_rows - start:]
+                start = skip_rows
+            count = end - start
+            texels = texels[:count, None]
+            mip_size = self.texture_size >> level
+            scale = self.texels_per_cell / (1 << level)
+            
+            # 该组各行、各列在当前mipmap等级下的纹素坐标，形状为 (行数, 列数)，全部写入复用的缓冲区
+            coords = self.coords[:count]
+            texel_x = self.texel_x[:count]
+            texel_y = self.texel_y[:count]
+            np.multiply(direction_x, texels, out=coords)
+            np.add(coords, np.float32(x * scale), out=coords)
+            np.floor(coords, out=coords)  # 先向下取整，负坐标（无限迷宫）转换成整数时不会向零截断
+            np.copyto(texel_x, coords, casting='unsafe')
+            np.multiply(direction_y, texels, out=coords)
+            np.add(coords, np.float32(y * scale), out=coords)
+            np.floor(coords, out=coords)
+            np.copyto(texel_y, coords, casting='unsafe')
+            
+            # 按纹理尺寸取模（纹理覆盖2x2个单元格，尺寸为2的幂），再合并成查找表中的下标
+            np.bitwise_and(texel_x, mip_size - 1, out=texel_x)
+            np.bitwise_and(texel_y, mip_size - 1, out=texel_y)
+            np.multiply(texel_x, mip_size, out=texel_x)
+            np.add(texel_x, texel_y, out=texel_x)
+            np.add(texel_x, fog_offsets[:count, None], out=texel_x)
+            
+            # 地板从地平线向下，天花板从地平线向上
+            floor_end = min(end, floor_rows)
+            if floor_end > start:
+                np.take(self.packed[level][0], texel_x[:floor_end - start], axis=0, mode='clip',
+                        out=frame[horizon + start:horizon + floor_end])
+            ceiling_end = min(end, ceiling_rows)
+            if ceiling_end > start:
+                np.take(self.packed[level][1], texel_x[ceiling_end - start - 1::-1], axis=0, mode='clip',
+                        out=frame[horizon - ceiling_end:horizon - start])
+        del frame
\ No newline at end of file
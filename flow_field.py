@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+
+class FlowField:
+    """以玩家所在单元格为起点的广度优先搜索距离场，所有猎手共享，每个猎手O(1)读出下一步"""
+    
+    def __init__(self, maze, max_distance=64):
+        self.maze = maze  # 迷宫引用
+        self.max_distance = max_distance  # 搜索的最大步数，更远的单元格视为不可达
+        
+        # 当前距离场所在的网格窗口：有限迷宫就是整个迷宫，无限迷宫是以玩家为中心的窗口
+        self.origin = (0, 0)
+        self.width = 0
+        self.height = 0
+        
+        # 每个单元格（窗口内的扁平序号）到玩家的步数（不可达为-1），以及朝玩家走一步后到达的单元格
+        self.distances = None
+        self.next_cells = None
+        
+        # 距离场对应的玩家单元格和迷宫版本，两者都不变时不需要重新计算
+        self.goal = None
+        self.maze_version = None
+        
+        # 重新计算的次数
+        self.rebuilds = 0
+    
+    def update(self, x, y):
+        """玩家移动到新的单元格或迷宫被修改时重新计算距离场，每帧调用一次"""
+        goal = (math.floor(x), math.floor(y))
+        if goal == self.goal and self.maze.version == self.maze_version:
+            return
+        self.goal = goal
+        self.maze_version = self.maze.version
+        self._build(goal)
+        self.rebuilds += 1
+    
+    def _build(self, goal):
+        """从玩家单元格出发逐层扩展（每层一次向量化操作），并为每个单元格选出距离更近的相邻单元格"""
+        # 只搜索玩家周围的窗口：窗口边缘比max_distance步能到达的最远单元格还多一格，
+        # 把边缘当作墙不会影响结果
+        radius = self.max_distance + 1
+        if self.maze.endless:
+            self.origin = (goal[0] - radius, goal[1] - radius)
+            walls = self.maze.get_region(self.origin[0], self.origin[1], 2 * radius + 1, 2 * radius + 1) == 1
+        else:
+            # 有限迷宫的窗口裁剪到迷宫范围内（迷宫边缘本身就是墙）
+            left, top = max(0, goal[0] - radius), max(0, goal[1] - radius)
+            right = min(self.maze.width, goal[0] + radius + 1)
+            bottom = min(self.maze.height, goal[1] + radius + 1)
+            self.origin = (left, top)
+            walls = self.maze.array[top:bottom, left:right] == 1
+        
+        # 把窗口边缘当作墙，使扩展时不会越界
+        walls[0, :] = walls[-1, :] = walls[:, 0] = walls[:, -1] = True
+        self.height, self.width = walls.shape
+        walls = walls.ravel()
+        offsets = np.array([-self.width, 1, self.width, -1], dtype=np.intp)
+        
+        distances = np.full(walls.shape, -1, dtype=np.int32)
+        start = self._local_index(*goal)
+        if start is not None and not walls[start]:
+            distances[start] = 0
+            frontier = np.array([start], dtype=np.intp)
+            distance = 0
+            while len(frontier) and distance < self.max_distance:
+                distance += 1
+                neighbors = (frontier[:, None] + offsets).ravel()
+                neighbors = np.unique(neighbors[~walls[neighbors] & (distances[neighbors] < 0)])
+                distances[neighbors] = distance
+                frontier = neighbors
+        self.distances = distances
+        
+        # 每个单元格的下一步是四个相邻单元格中距离恰好小1的那个（不可达或已在终点时指向自身）
+        cells = np.arange(len(distances), dtype=np.intp)
+        next_cells = cells.copy()
+        reachable = np.flatnonzero(distances > 0)
+        for offset in offsets:
+            neighbors = reachable + offset
+            closer = distances[neighbors] == distances[reachable] - 1
+            next_cells[reachable[closer]] = neighbors[closer]
+        self.next_cells = next_cells
+    
+    def _local_index(self, x, y):
+        """世界坐标所在单元格在窗口内的扁平序号，不在窗口内时返回None"""
+        local_x = math.floor(x) - self.origin[0]
+        local_y = math.floor(y) - self.origin[1]
+        if 0 <= local_x < self.width and 0 <= local_y < self.height:
+            return local_y * self.width + local_x
+        return None
+    
+    def distance(self, x, y):
+        """坐标所在单元格到玩家的步数，不可达时返回-1"""
+        index = self._local_index(x, y)
+        if index is None or self.distances is None:
+            return -1
+        return int(self.distances[index])
+    
+    def next_steps(self, x, y):
+        """从各坐标所在单元格朝玩家走一步后到达的单元格中心：返回X、Y坐标数组，以及每个坐标是否有下一步
+        （不可达或已在玩家单元格时没有）"""
+        local_x = np.floor(x).astype(np.intp) - self.origin[0]
+        local_y = np.floor(y).astype(np.intp) - self.origin[1]
+        valid = (local_x >= 0) & (local_x < self.width) & (local_y >= 0) & (local_y < self.height)
+        if self.distances is None:
+            valid[:] = False
+        index = np.where(valid, local_y * self.width + local_x, 0)
+        if self.distances is not None:
+            valid &= self.distances[index] > 0
+            next_cells = self.next_cells[index]
+        else:
+            next_cells = index
+        return (self.origin[0] + next_cells % max(self.width, 1) + 0.5,
+                self.origin[1] + next_cells // max(self.width, 1) + 0.5, valid)
\ No newline at end of file
@@ -0,0 +1,61 @@
+import numpy as np
+
+class FogTable:
+    """预计算的分级雾效果查找表，墙壁和实体纹理共用"""
+    
+    def __init__(self, fog_color, max_depth, levels=64, max_bytes=16 * 1024 * 1024):
+        self.fog_color = fog_color  # 雾的颜色
+        self.max_depth = max_depth  # 雾完全覆盖时的距离
+        self.levels = levels  # 每组纹理的雾等级数量（距离分桶数）
+        self.max_bytes = max_bytes  # 所有查找表的内存上限
+        
+        # 每组纹理的查找表，形状为 (纹理数, 雾等级, 宽, 高, 通道)
+        self.tables = {}
+        self.table_levels = {}
+    
+    def add(self, name, textures):
+        """为一组纹理（形状为 (纹理数, 宽, 高, 通道) 的uint8数组）预计算各雾等级的颜色"""
+        textures = np.asarray(textures, dtype=np.uint8)
+        
+        # 如果超出内存上限，则减少这一组的雾等级数量
+        level_bytes = textures.nbytes
+        available = self.max_bytes - self.memory_bytes + self.tables.get(name, np.empty(0)).nbytes
+        levels = min(self.levels, available // level_bytes)
+        if levels < 2:
+            raise MemoryError(f'雾效果查找表"{name}"需要至少{2 * level_bytes}字节，超出了内存上限')
+        
+        # 按等级混合纹理颜色和雾的颜色（透明度通道保持不变）
+        factors = np.linspace(0.0, 1.0, levels, dtype=np.float32)[None, :, None, None, None]
+        rgb = textures[:, None, :, :, :3].astype(np.float32)
+        fog_color = np.array(self.fog_color, dtype=np.float32)
+        table = np.empty((textures.shape[0], levels) + textures.shape[1:], dtype=np.uint8)
+        table[..., :3] = rgb * (1 - factors) + fog_color * factors
+        if textures.shape[-1] > 3:
+            table[..., 3:] = textures[:, None, :, :, 3:]
+        
+        self.tables[name] = table
+        self.table_levels[name] = levels
+        return table
+    
+    def bucket(self, name, distance):
+        """把距离（标量或数组）转换为对应纹理组的雾等级"""
+        levels = self.table_levels[name]
+        fog_factor = np.minimum(1.0, np.asarray(distance) / self.max_depth)
+        return (fog_factor * (levels - 1) + 0.5).astype(np.intp)
+    
+    def lookup(self, name, texture_index, distance):
+        """获取指定纹理在给定距离下已应用雾效果的颜色数组"""
+        return self.tables[name][texture_index, self.bucket(name, distance)]
+    
+    @property
+    def memory_bytes(self):
+        """所有查找表占用的内存（字节）"""
+        return sum(table.nbytes for table in self.tables.values())
+    
+    def memory_report(self):
+        """报告每组查找表的雾等级数量和内存占用"""
+        report = {name: {'levels': self.table_levels[name], 'bytes': table.nbytes}
+                  for name, table in self.tables.items()}
+        report['total_bytes'] = self.memory_bytes
+        report['max_bytes'] = self.max_bytes
+        return report
\ No newline at end of file
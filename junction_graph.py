@@ -0,0 +1,196 @@
+import heapq
+
+import numpy as np
+
+class JunctionGraph:
+    """迷宫的压缩图：节点是路口和死胡同（相邻通道数不为2的通道单元格），边是连接它们的走廊及其长度"""
+    
+    def __init__(self, maze):
+        self.maze = maze  # 迷宫引用（迷宫边缘都是墙）
+        count = maze.width * maze.height
+        
+        # 节点对应的单元格（扁平序号），以及每个单元格对应的节点（不是节点为-1）
+        self.nodes = []
+        self.node_ids = np.full(count, -1, dtype=np.int32)
+        
+        # 每条边为 (起点节点, 终点节点, 长度, 按从起点到终点顺序排列的走廊单元格)，
+        # 每个走廊单元格所在的边及其到起点节点的步数
+        self.edges = []
+        self.edge_of = np.full(count, -1, dtype=np.int32)
+        self.offset_of = np.zeros(count, dtype=np.int32)
+        
+        # 每个节点的相邻节点列表，每项为 (相邻节点, 长度, 边)
+        self.adjacency = []
+        
+        # 按相邻通道数找出所有路口和死胡同
+        passages = maze.array == 0
+        degree = np.zeros(maze.array.shape, dtype=np.int8)
+        degree[1:-1, 1:-1] = (passages[:-2, 1:-1].astype(np.int8) + passages[2:, 1:-1] +
+                              passages[1:-1, :-2] + passages[1:-1, 2:])
+        for cell in np.flatnonzero(passages & (degree != 2)).tolist():
+            self._add_node(cell)
+        for node in range(len(self.nodes)):
+            self._trace(node)
+        
+        # 没有任何路口的环形走廊：取其中一个单元格作为节点
+        for cell in np.flatnonzero(passages.ravel() & (self.node_ids < 0) & (self.edge_of < 0)).tolist():
+            if self.edge_of[cell] < 0:
+                self._trace(self._add_node(cell))
+    
+    def _add_node(self, cell):
+        """把单元格加入节点列表"""
+        self.node_ids[cell] = len(self.nodes)
+        self.nodes.append(cell)
+        self.adjacency.append([])
+        return len(self.nodes) - 1
+    
+    def _trace(self, node):
+        """从节点出发沿每条尚未记录的走廊前进，直到到达另一个节点"""
+        start = self.nodes[node]
+        for first in self.maze.open_neighbors(start):
+            if self.node_ids[first] >= 0:
+                # 相邻的两个节点之间是没有走廊单元格的边，只从序号较小的一端记录一次
+                if node < self.node_ids[first]:
+                    self._add_edge(node, int(self.node_ids[first]), ())
+                continue
+            if self.edge_of[first] >= 0:
+                # 已经从走廊的另一端记录过
+                continue
+            
+            corridor = []
+            previous, current = start, first
+            while self.node_ids[current] < 0:
+                corridor.append(current)
+                a, b = self.maze.open_neighbors(current)
+                previous, current = current, (b if a == previous else a)
+            self._add_edge(node, int(self.node_ids[current]), tuple(corridor))
+    
+    def _add_edge(self, a, b, corridor):
+        """记录一条走廊"""
+        edge = len(self.edges)
+        length = len(corridor) + 1
+        self.edges.append((a, b, length, corridor))
+        if corridor:
+            self.edge_of[list(corridor)] = edge
+            self.offset_of[list(corridor)] = np.arange(1, length, dtype=np.int32)
+        self.adjacency[a].append((b, length, edge))
+        if a != b:
+            self.adjacency[b].append((a, length, edge))
+    
+    def _cell_on(self, edge, offset):
+        """边上距起点节点offset步的单元格"""
+        a, b, length, corridor = self.edges[edge]
+        if offset == 0:
+            return self.nodes[a]
+        if offset == length:
+            return self.nodes[b]
+        return corridor[offset - 1]
+    
+    def _walk(self, edge, start, end):
+        """沿边从距起点start步走到end步经过的单元格（不含出发的单元格）"""
+        step = 1 if end > start else -1
+        return [self._cell_on(edge, offset) for offset in range(start + step, end + step, step)]
+    
+    def _anchors(self, cell):
+        """单元格可以到达的节点，每项为 (节点, 步数, 所在边, 节点在边上的位置)；单元格本身是节点时所在边为None"""
+        node = int(self.node_ids[cell])
+        if node >= 0:
+            return [(node, 0, None, 0)]
+        edge = int(self.edge_of[cell])
+        a, b, length, _ = self.edges[edge]
+        offset = int(self.offset_of[cell])
+        return [(a, offset, edge, 0), (b, length - offset, edge, length)]
+    
+    def find_path(self, start, goal, max_nodes=None):
+        """在压缩图上用A*寻找从start到goal（扁平序号）的最短路径，只在两端展开走廊中的单元格；
+        返回 (经过的单元格列表（不含起点），展开的节点数)，找不到时列表为空"""
+        if start == goal:
+            return [], 0
+        width = self.maze.width
+        goal_x, goal_y = goal % width, goal // width
+        
+        def heuristic(node):
+            cell = self.nodes[node]
+            return abs(cell % width - goal_x) + abs(cell // width - goal_y)
+        
+        # 终点可以从哪些节点以多少步到达
+        goal_anchors = {}
+        for node, cost, edge, position in self._anchors(goal):
+            if node not in goal_anchors or cost < goal_anchors[node][0]:
+                goal_anchors[node] = (cost, edge, position)
+        
+        # 起点和终点在同一条走廊上时，沿走廊直接走过去是一个候选
+        best_cost = float('inf')
+        best = None
+        start_anchors = self._anchors(start)
+        goal_edge = self.edge_of[goal] if self.node_ids[goal] < 0 else -1
+        if self.node_ids[start] < 0 and self.edge_of[start] == goal_edge:
+            best_cost = abs(int(self.offset_of[start]) - int(self.offset_of[goal]))
+        
+        g_score = {}
+        came_from = {}
+        open_heap = []
+        for node, cost, edge, position in start_anchors:
+            if cost < g_score.get(node, float('inf')):
+                g_score[node] = cost
+                came_from[node] = (None, edge, position)
+                heapq.heappush(open_heap, (cost + heuristic(node), node))
+        
+        expanded = 0
+        while open_heap:
+            f, node = heapq.heappop(open_heap)
+            if f >= best_cost:
+                break
+            g = g_score[node]
+            if f - heuristic(node) > g:
+                continue
+            expanded += 1
+            if max_nodes is not None and expanded > max_nodes:
+                return [], expanded
+            
+            if node in goal_anchors and g + goal_anchors[node][0] < best_cost:
+                best_cost = g + goal_anchors[node][0]
+                best = node
+            
+            for neighbor, length, edge in self.adjacency[node]:
+                tentative_g_score = g + length
+                if tentative_g_score < g_score.get(neighbor, float('inf')):
+                    g_score[neighbor] = tentative_g_score
+                    came_from[neighbor] = (node, edge, None)
+                    heapq.heappush(open_heap, (tentative_g_score + heuristic(neighbor), neighbor))
+        
+        if best_cost == float('inf'):
+            return [], expanded
+        if best is None:
+            # 沿同一条走廊直接走到终点
+            edge = int(self.edge_of[start])
+            return self._walk(edge, int(self.offset_of[start]), int(self.offset_of[goal])), expanded
+        
+        # 从最后一个节点回溯到起点，逐段展开成单元格
+        segments = []
+        cost, edge, position = goal_anchors[best]
+        if edge is not None:
+            segments.append(self._walk(edge, position, int(self.offset_of[goal])))
+        node = best
+        while True:
+            previous, edge, position = came_from[node]
+            if previous is None:
+                break
+            a, b, length, _ = self.edges[edge]
+            segments.append(self._walk(edge, 0, length) if previous == a else self._walk(edge, length, 0))
+            node = previous
+        if edge is not None:
+            segments.append(self._walk(edge, int(self.offset_of[start]), position))
+        
+        path = []
+        for segment in reversed(segments):
+            path.extend(segment)
+        return path, expanded
+    
+    def stats(self):
+        """压缩图的规模"""
+        return {
+            'nodes': len(self.nodes),
+            'edges': len(self.edges),
+            'cells': int(np.count_nonzero(self.maze.array == 0))
+        }
\ No newline at end of file
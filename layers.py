@@ -0,0 +1,88 @@
+import pygame
+
+class BackgroundLayers:
+    """与玩家位置无关的静态图层（天花板、地板、荧光灯和全局雾），每种分辨率只生成一次"""
+    
+    def __init__(self, ceiling_color, floor_color):
+        self.ceiling_color = ceiling_color  # 天花板颜色
+        self.floor_color = floor_color  # 地板颜色
+        
+        # 荧光灯参数（以800像素宽的画面为基准，其他分辨率按比例缩放）
+        self.reference_width = 800
+        self.light_spacing = 120  # 荧光灯间距
+        self.light_width = 80
+        self.light_height = 10
+        self.light_scroll_interval = 50  # 荧光灯每移动一个像素所需的毫秒数
+        
+        # 全局雾效果的颜色
+        self.fog_color = (220, 220, 200, 30)  # 淡黄色雾效果，轻微透明
+        
+        # 缓存的图层
+        self.size = None
+        self.background = None
+        self.light_strip = None
+        self.light_strip_top = 0
+        self.strip_spacing = self.light_spacing
+        self.light_area = None
+        self.fog_overlay = None
+    
+    def _build(self, size):
+        """为给定分辨率生成所有图层"""
+        screen_width, screen_height = size
+        self.size = size
+        
+        # 天花板和地板
+        self.background = pygame.Surface(size)
+        self.background.fill(self.ceiling_color, (0, 0, screen_width, screen_height // 2))
+        self.background.fill(self.floor_color, (0, screen_height // 2, screen_width, screen_height - screen_height // 2))
+        
+        # 预先渲染一条比屏幕宽两个灯间距的荧光灯带，滚动时只需偏移绘制位置
+        scale = screen_width / self.reference_width
+        spacing = max(1, round(self.light_spacing * scale))
+        light_width = max(1, round(self.light_width * scale))
+        light_height = max(1, round(self.light_height * scale))
+        self.strip_spacing = spacing
+        
+        ceiling_height = screen_height // 2
+        glow_margin = 6  # 发光效果超出灯体的高度
+        strip_height = light_height + glow_margin
+        self.light_strip_top = ceiling_height // 2 - light_height // 2 - glow_margin // 2
+        self.light_strip = pygame.Surface((screen_width + 2 * spacing, strip_height))
+        self.light_strip.fill(self.ceiling_color)
+        self.light_area = pygame.Rect(0, 0, screen_width, strip_height)
+        
+        for x in range(spacing, self.light_strip.get_width(), spacing):
+            # 绘制灯的主体
+            light_rect = pygame.Rect(x - light_width // 2, glow_margin // 2, light_width, light_height)
+            pygame.draw.rect(self.light_strip, (255, 255, 255), light_rect)
+            
+            # 绘制灯的发光效果
+            for i in range(1, 4):
+                glow_rect = light_rect.inflate(i * 4, i * 2)
+                glow_color = (255, 255, 255, 100 - i * 30)
+                glow_surface = pygame.Surface((glow_rect.width, glow_rect.height), pygame.SRCALPHA)
+                pygame.draw.rect(glow_surface, glow_color, (0, 0, glow_rect.width, glow_rect.height))
+                self.light_strip.blit(glow_surface, glow_rect)
+        
+        # 全局雾效果
+        self.fog_overlay = pygame.Surface(size, pygame.SRCALPHA)
+        self.fog_overlay.fill(self.fog_color)
+    
+    def draw_background(self, screen, ticks):
+        """绘制天花板、地板和滚动的荧光灯"""
+        if screen.get_size() != self.size:
+            self._build(screen.get_size())
+        
+        screen.blit(self.background, (0, 0))
+        
+        # 荧光灯带按时间向左滚动
+        offset = ticks // self.light_scroll_interval * self.strip_spacing // self.light_spacing
+        self.light_area.x = self.strip_spacing + offset % self.strip_spacing
+        screen.blit(self.light_strip, (0, self.light_strip_top), self.light_area)
+    
+    def apply_fog(self, screen):
+        """应用全局雾效果"""
+        if screen.get_size() != self.size:
+            self._build(screen.get_size())
+        
+        screen.blit(self.fog_overlay, (0, 0))
\ No newline at end of file
@@ -1,7 +1,6 @@
 import pygame
 import sys
 import random
-import math
 from pygame.locals import *
 
 # 初始化Pygame
@@ -12,6 +11,23 @@ SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FPS = 60
 
+# 动态分辨率：渲染耗时超出预算时自动降低内部分辨率
+DYNAMIC_RESOLUTION = True
+RENDER_BUDGET_MS = 12  # 每帧渲染3D视图的目标耗时（毫秒）
+RENDER_WORKERS = 1  # 大于1时把屏幕按列分块，由多个线程并行投射光线和光栅化墙壁
+
+# 无限模式：迷宫按区块在后台逐步生成，没有边界
+ENDLESS_MODE = False
+
+# 迷宫生成算法：'dfs'（深度优先搜索）或'sidewinder'（向量化生成，适合很大的迷宫），无限模式的区块也使用该算法
+MAZE_ALGORITHM = 'dfs'
+
+# 实体（敌人）数量：所有实体存放在EntityPool的数组中并向量化更新，可以设置到成百上千
+ENTITY_COUNT = 5
+
+# 性能分析：按F3显示性能面板；设置导出路径（.csv或.json）后会在退出时写入各计时器的记录
+PROFILE_DUMP_PATH = None
+
 # 颜色定义
 YELLOW = (245, 235, 180)  # 更新为更浅的黄色
 DARK_YELLOW = (235, 225, 170)  # 更新为更浅的暗黄色
@@ -27,31 +43,49 @@ clock = pygame.time.Clock()
 
 # 加载游戏资源
 font = pygame.font.SysFont('Arial', 24)
+debug_font = pygame.font.SysFont('Courier New', 14)
 
 # 导入游戏模块
 from maze import Maze
+from chunked_maze import ChunkedMaze
 from player import Player
-from entity import Entity
+from entity_pool import EntityPool
 from raycasting import Raycaster
 from game_state import GameState
+from profiler import Profiler
+from flow_field import FlowField
+from pathfinding import PathFinder
 
 # 主游戏类
 class Game:
     def __init__(self):
         self.running = True
         self.game_state = GameState()
-        self.maze = Maze(20, 20)  # 创建20x20的迷宫
+        self.profiler = Profiler(enabled=PROFILE_DUMP_PATH is not None)
+        if ENDLESS_MODE:
+            self.maze = ChunkedMaze(algorithm=MAZE_ALGORITHM)
+        else:
+            self.maze = Maze(20, 20, algorithm=MAZE_ALGORITHM)  # 创建20x20的迷宫
         
         # 确保玩家起始位置是空地
         start_x, start_y = self.maze.get_random_empty_position()
         self.player = Player(start_x + 0.5, start_y + 0.5, self.maze)
         
         # 创建光线投射器
-        self.raycaster = Raycaster(self.maze)
+        self.raycaster = Raycaster(self.maze, self.profiler)
+        self.raycaster.set_workers(RENDER_WORKERS)
+        if DYNAMIC_RESOLUTION:
+            self.raycaster.enable_dynamic_resolution(RENDER_BUDGET_MS)
+        
+        # 所有猎手共享的朝向玩家的距离场
+        self.flow_field = FlowField(self.maze)
+        
+        # 所有实体共享的A*寻路及路径缓存（玩家超出距离场范围时使用）
+        self.path_finder = PathFinder(self.maze, self.profiler)
         
         # 创建实体（敌人）
-        self.entities = []
-        self.spawn_entities(5)  # 生成5个实体
+        self.entities = EntityPool(self.maze, self.flow_field, self.path_finder)
+        self.spawn_entities(ENTITY_COUNT)
         
         # 游戏状态变量
         self.game_over = False
@@ -61,16 +95,15 @@ class Game:
         
     def spawn_entities(self, count):
         for _ in range(count):
-            # 确保实体生成在空地上，且与玩家有一定距离
-            while True:
-                x, y = self.maze.get_random_empty_position()
-                # 计算与玩家的距离
-                dist = math.sqrt((x - self.player.x)**2 + (y - self.player.y)**2)
-                if dist > 5:  # 确保实体与玩家的初始距离足够远
-                    break
+            # 确保实体生成在空地上，且与玩家的初始距离足够远
+            position = self.maze.get_random_empty_position_far_from(self.player.x, self.player.y, 5)
+            if position is None:
+                # 迷宫太小，没有足够远的空地
+                position = self.maze.get_random_empty_position()
+            x, y = position
             
             entity_type = random.choice(['crawler', 'watcher', 'hunter'])
-            self.entities.append(Entity(x + 0.5, y + 0.5, entity_type, self.maze))
+            self.entities.add(x + 0.5, y + 0.5, entity_type)
     
     def handle_events(self):
         for event in pygame.event.get():
@@ -79,8 +112,14 @@ class Game:
             elif event.type == KEYDOWN:
                 if event.key == K_ESCAPE:
                     self.running = False
+                # 按F3显示或隐藏性能面板
+                if event.key == K_F3:
+                    self.profiler.toggle_overlay()
                 # 游戏结束时按R键重新开始
                 if (self.game_over or self.win) and event.key == K_r:
+                    self.raycaster.close()
+                    if ENDLESS_MODE:
+                        self.maze.close()
                     self.__init__()
     
     def update(self):
@@ -88,16 +127,25 @@ class Game:
             return
         
         # 更新玩家位置
-        self.player.update()
+        with self.profiler.section('player'):
+            self.player.update()
         
-        # 更新实体
-        for entity in self.entities:
-            entity.update(self.player)
-            
-            # 检测实体与玩家的碰撞
-            dist = math.sqrt((entity.x - self.player.x)**2 + (entity.y - self.player.y)**2)
-            if dist < 0.5:  # 如果实体与玩家距离小于0.5个单位，游戏结束
-                self.game_over = True
+        # 无限模式下载入玩家附近的区块
+        if ENDLESS_MODE:
+            with self.profiler.section('chunks'):
+                self.maze.update(self.player.x, self.player.y)
+        
+        # 玩家进入新的单元格时重新计算距离场
+        with self.profiler.section('flow_field'):
+            self.flow_field.update(self.player.x, self.player.y)
+        
+        # 向量化更新所有实体
+        with self.profiler.section('ai'):
+            self.entities.update(self.player)
+        
+        # 检测实体与玩家的碰撞：如果实体与玩家距离小于0.5个单位，游戏结束
+        if self.entities.caught(self.player, 0.5):
+            self.game_over = True
         
         # 更新生存时间
         self.survival_time = (pygame.time.get_ticks() - self.start_time) // 1000
@@ -111,12 +159,8 @@ class Game:
         screen.fill(BLACK)
         
         if not self.game_over and not self.win:
-            # 使用光线投射器渲染3D视图
-            self.raycaster.render(screen, self.player)
-            
-            # 渲染实体
-            for entity in self.entities:
-                self.raycaster.render_entity(screen, self.player, entity)
+            # 使用光线投射器渲染3D视图（实体按深度排序后一并渲染）
+            self.raycaster.render(screen, self.player, self.entities)
             
             # 渲染UI
             self.render_ui()
@@ -129,46 +173,61 @@ class Game:
         pygame.display.flip()
     
     def render_ui(self):
-        # 显示生存时间
-        time_text = font.render(f'life times: {self.survival_time}s', True, WHITE)
-        screen.blit(time_text, (10, 10))
-        
-        # 显示剩余时间
-        remaining_time = max(0, 300 - self.survival_time)
-        remaining_text = font.render(f'remaining time: {remaining_time}s', True, WHITE)
-        screen.blit(remaining_text, (10, 40))
+        with self.profiler.section('hud'):
+            # 显示生存时间
+            time_text = font.render(f'life times: {self.survival_time}s', True, WHITE)
+            screen.blit(time_text, (10, 10))
+            
+            # 显示剩余时间
+            remaining_time = max(0, 300 - self.survival_time)
+            remaining_text = font.render(f'remaining time: {remaining_time}s', True, WHITE)
+            screen.blit(remaining_text, (10, 40))
         
         # 显示小地图
-        self.render_minimap()
+        with self.profiler.section('minimap'):
+            self.render_minimap()
+        
+        # 显示性能面板
+        self.profiler.draw_overlay(screen, debug_font)
     
     def render_minimap(self):
         # 小地图尺寸和位置
         map_size = 100
-        cell_size = map_size / max(self.maze.width, self.maze.height)
         map_x = SCREEN_WIDTH - map_size - 10
         map_y = 10
         
+        # 有限迷宫显示整个迷宫，无限迷宫显示玩家周围20x20的范围
+        if self.maze.endless:
+            origin_x = int(self.player.x) - 10
+            origin_y = int(self.player.y) - 10
+            grid = self.maze.get_region(origin_x, origin_y, 20, 20)
+        else:
+            origin_x = origin_y = 0
+            grid = self.maze.grid
+        cell_size = map_size / max(len(grid), len(grid[0]))
+        
         # 绘制小地图背景
         pygame.draw.rect(screen, GRAY, (map_x, map_y, map_size, map_size))
         
         # 绘制墙壁
-        for y in range(self.maze.height):
-            for x in range(self.maze.width):
-                if self.maze.grid[y][x] == 1:  # 如果是墙
+        for y in range(len(grid)):
+            for x in range(len(grid[0])):
+                if grid[y][x] == 1:  # 如果是墙
                     pygame.draw.rect(screen, DARK_YELLOW, 
                                     (map_x + x * cell_size, map_y + y * cell_size, 
                                      cell_size, cell_size))
         
         # 绘制玩家位置
-        player_x = map_x + self.player.x * cell_size
-        player_y = map_y + self.player.y * cell_size
+        player_x = map_x + (self.player.x - origin_x) * cell_size
+        player_y = map_y + (self.player.y - origin_y) * cell_size
         pygame.draw.circle(screen, WHITE, (int(player_x), int(player_y)), 2)
         
-        # 绘制实体位置
-        for entity in self.entities:
-            entity_x = map_x + entity.x * cell_size
-            entity_y = map_y + entity.y * cell_size
-            pygame.draw.circle(screen, RED, (int(entity_x), int(entity_y)), 2)
+        # 绘制实体位置（只绘制小地图范围内的实体）
+        for x, y in zip(*self.entities.positions()):
+            entity_x = map_x + (x - origin_x) * cell_size
+            entity_y = map_y + (y - origin_y) * cell_size
+            if map_x <= entity_x < map_x + map_size and map_y <= entity_y < map_y + map_size:
+                pygame.draw.circle(screen, RED, (int(entity_x), int(entity_y)), 2)
     
     def render_game_over(self):
         # 游戏结束画面
@@ -191,10 +250,21 @@ class Game:
     def run(self):
         # 主游戏循环
         while self.running:
-            self.handle_events()
-            self.update()
-            self.render()
+            with self.profiler.section('frame'):
+                self.handle_events()
+                self.update()
+                self.render()
+            self.profiler.end_frame()
             clock.tick(FPS)
+        
+        # 停止渲染线程和后台生成区块的线程
+        self.raycaster.close()
+        if ENDLESS_MODE:
+            self.maze.close()
+        
+        # 导出性能记录
+        if PROFILE_DUMP_PATH:
+            self.profiler.dump(PROFILE_DUMP_PATH)
 
 # 游戏入口点
 def main():
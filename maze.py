@@ -1,18 +1,124 @@
+import math
+import mmap
+import os
 import random
+import struct
+
+import numpy as np
+
+from junction_graph import JunctionGraph
+
+# 迷宫文件格式：64字节的文件头，随后是网格（每个单元格一个字节，与内存中的布局相同）和墙壁纹理索引平面，
+# 载入时直接映射到内存，不需要解析或复制
+MAZE_FILE_MAGIC = b'BKRM'
+MAZE_FILE_VERSION = 1
+MAZE_FILE_HEADER = struct.Struct('<4sHHIIQ16s')  # 标识、格式版本、文件头长度、宽、高、种子、生成算法
+MAZE_FILE_HEADER_SIZE = 64
+
+# 墙壁材质，即纹理索引平面中的取值（与Raycaster中墙壁纹理的顺序一致）
+MATERIAL_WALLPAPER = 0  # 标准墙纸
+MATERIAL_STAINED = 1  # 带有轻微污渍的墙纸
+MATERIAL_SOCKET = 2  # 带有电源插座的墙纸
+MATERIAL_WATER_DAMAGE = 3  # 被水浸泡过的墙纸
+MATERIAL_DOOR = 4  # 门
 
 class Maze:
-    def __init__(self, width, height):
+    endless = False  # 有限大小的迷宫（无限迷宫见ChunkedMaze）
+    generators = {'dfs': '_carve_dfs', 'sidewinder': '_carve_sidewinder'}  # 生成算法名称及对应的方法
+    material_weights = (0.62, 0.2, 0.1, 0.08)  # 墙纸、污渍、插座、水渍四种墙面材质的比例
+    door_ratio = 0.04  # 夹在两个通道之间的墙中被替换成门的比例
+    
+    def __init__(self, width, height, seed=None, algorithm='dfs'):
+        if algorithm not in self.generators:
+            raise ValueError(f'未知的迷宫生成算法: {algorithm}')
+        if seed is not None and not 0 <= seed < 2 ** 64:
+            raise ValueError(f'迷宫种子必须在0到2**64-1之间（迷宫文件中以64位无符号整数保存）: {seed}')
+        
+        # 生成只使用自己的随机数生成器，同样的种子、尺寸和算法总是生成同样的迷宫；
+        # 不指定种子时从全局random取一个，因此random.seed()仍然能复现迷宫
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.algorithm = algorithm
+        self.random = random.Random(self.seed)
+        
+        self._init_storage(width, height, bytearray(b'\x01') * (width * height), bytearray(width * height))
+        self.generate()
+    
+    def _init_storage(self, width, height, cells, textures):
+        """在给定的缓冲区（bytearray或内存映射）上建立网格、纹理平面和各种索引"""
         self.width = width
         self.height = height
-        self.grid = [[1 for _ in range(width)] for _ in range(height)]  # 1表示墙，0表示通道
-        self.generate()
+        
+        # 网格按行连续存放，每个单元格一个字节（1表示墙，0表示通道），
+        # 单元格 (x, y) 的扁平序号为 y * width + x
+        self.cells = cells
+        
+        # 零拷贝的NumPy视图，形状为 (高, 宽)：_array可写，只供生成算法使用；
+        # 公开的array是只读的，生成之后的修改必须通过set_cell，使依赖网格的索引和缓存随之失效
+        self._array = np.frombuffer(self.cells, dtype=np.uint8).reshape(height, width)
+        self.array = self._array.view()
+        self.array.flags.writeable = False
+        
+        # 每个单元格的墙壁纹理索引，与网格布局相同
+        self.textures = textures
+        self.texture_array = np.frombuffer(self.textures, dtype=np.uint8).reshape(height, width)
+        
+        # 兼容 grid[y][x] 的访问方式：每行是cells的一个只读memoryview切片
+        view = memoryview(self.cells).toreadonly()
+        self.grid = [view[y * width:(y + 1) * width] for y in range(height)]
+        
+        # 上、右、下、左四个相邻单元格的扁平序号偏移
+        self.neighbor_offsets = (-width, 1, width, -1)
+        
+        # 每次修改网格后递增，依赖网格的缓存据此判断是否需要重建
+        self.version = 0
+        
+        # 所有通道单元格的扁平序号（int32数组的前open_count项，用于O(1)随机采样），
+        # 以及每个单元格在其中的位置（墙为-1，只在修改网格时需要）；
+        # 都在首次使用时建立，使载入大迷宫文件时不需要扫描整个网格
+        self._open_cells = None
+        self._open_count = 0
+        self._open_slots = None
+        
+        # 路口和走廊组成的压缩图，首次使用时建立，网格修改后失效
+        self._junctions = None
+        
+        # 单元格之间的潜在可见集（PVS）：键为通道单元格的扁平序号，值为以该单元格为中心、
+        # 边长 2*visibility_range+1 的窗口内各单元格是否可见的位集；每行在cells_visible首次用到时计算
+        # （也可以用build_visibility预先计算），网格修改后全部失效
+        self.visibility_range = 20  # 可见集记录的最大距离（单元格），与渲染的最大深度一致
+        self.visibility = {}
     
     def generate(self):
+        """使用algorithm指定的算法生成迷宫"""
+        self.carve(self.cells, self.width, self.height, self.algorithm, self.random)
+        
+        # 确保迷宫边缘是墙
+        self._ensure_walls_at_edges()
+        self._build_textures()
+        self._open_cells = self._open_slots = None
+        self._open_count = 0
+        self._grid_changed()
+    
+    @classmethod
+    def carve(cls, cells, width, height, algorithm, rng):
+        """在按行存放、初始全部为墙的缓冲区cells上用algorithm指定的算法生成迷宫，并添加随机通道；
+        房间位于奇数坐标上，rng为random.Random（无限迷宫的区块也使用这个方法生成）"""
+        getattr(cls, cls.generators[algorithm])(cells, width, height, rng)
+        
+        # 添加一些随机的通道以增加迷宫的复杂性
+        cls._add_random_passages(cells, width, height, rng)
+    
+    @staticmethod
+    def _carve_dfs(cells, width, height, rng):
         """使用深度优先搜索算法生成迷宫"""
+        # 按行访问的可写视图
+        view = memoryview(cells)
+        grid = [view[y * width:(y + 1) * width] for y in range(height)]
+        
         # 从一个随机的奇数坐标开始
-        start_x = random.randrange(1, self.width - 1, 2)
-        start_y = random.randrange(1, self.height - 1, 2)
-        self.grid[start_y][start_x] = 0
+        start_x = rng.randrange(1, width - 1, 2)
+        start_y = rng.randrange(1, height - 1, 2)
+        grid[start_y][start_x] = 0
         
         # 创建一个栈来存储访问过的单元格
         stack = [(start_x, start_y)]
@@ -27,81 +133,359 @@ class Maze:
             neighbors = []
             for dx, dy in directions:
                 nx, ny = current_x + dx, current_y + dy
-                if 0 < nx < self.width - 1 and 0 < ny < self.height - 1 and self.grid[ny][nx] == 1:
+                if 0 < nx < width - 1 and 0 < ny < height - 1 and grid[ny][nx] == 1:
                     neighbors.append((nx, ny, dx, dy))
             
             if neighbors:
                 # 随机选择一个未访问的邻居
-                nx, ny, dx, dy = random.choice(neighbors)
+                nx, ny, dx, dy = rng.choice(neighbors)
                 
                 # 打通墙壁
-                self.grid[current_y + dy // 2][current_x + dx // 2] = 0
-                self.grid[ny][nx] = 0
+                grid[current_y + dy // 2][current_x + dx // 2] = 0
+                grid[ny][nx] = 0
                 
                 # 将新单元格添加到栈中
                 stack.append((nx, ny))
             else:
                 # 如果没有未访问的邻居，则回溯
                 stack.pop()
+    
+    @staticmethod
+    def _carve_sidewinder(cells, width, height, rng):
+        """使用向量化的Sidewinder算法生成迷宫：逐行把房间随机连成向东的一段，每段随机选一个房间向北打通，
+        所有行同时处理，2000x2000的迷宫也只需几十毫秒"""
+        rows = (height - 1) // 2
+        columns = (width - 1) // 2
+        if rows < 1 or columns < 1:
+            return
+        grid = np.frombuffer(cells, dtype=np.uint8).reshape(height, width)
+        rng = np.random.default_rng(rng.randrange(2 ** 32))
         
-        # 添加一些随机的通道以增加迷宫的复杂性
-        self._add_random_passages()
+        # 房间位于奇数坐标上
+        grid[1:2 * rows:2, 1:2 * columns:2] = 0
         
-        # 确保迷宫边缘是墙
-        self._ensure_walls_at_edges()
+        # 是否向东打通（第一行没有北边可以打通，整行连通）
+        east = rng.random((rows, columns - 1)) < 0.5
+        east[0] = True
+        grid[1:2 * rows:2, 2:2 * columns - 1:2][east] = 0
+        
+        # 每段在不向东打通的房间处结束（每行最后一个房间总是结束一段，因此段不会跨行）
+        closes = np.ones((rows, columns), dtype=bool)
+        closes[:, :-1] = ~east
+        ends = np.flatnonzero(closes)
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        
+        # 除第一行外，每段随机选一个房间向北打通
+        chosen = starts + (rng.random(len(starts)) * (ends - starts + 1)).astype(np.intp)
+        chosen = chosen[chosen >= columns]
+        grid[2 * (chosen // columns), 2 * (chosen % columns) + 1] = 0
+    
+    def _build_textures(self):
+        """由种子确定每个单元格的墙壁材质（纹理索引）"""
+        self.texture_array[:] = self.wall_materials(self.array, np.random.default_rng(self.seed))
+    
+    @classmethod
+    def wall_materials(cls, grid, rng):
+        """为网格中的每个单元格随机选择墙面材质，并把少量夹在两个通道之间的墙换成门"""
+        weights = np.asarray(cls.material_weights, dtype=np.float64)
+        thresholds = np.cumsum(weights / weights.sum())[:-1]
+        materials = np.searchsorted(thresholds, rng.random(grid.shape), side='right').astype(np.uint8)
+        
+        # 门只出现在左右或上下两侧都是通道的墙上，看起来像通往隔壁走廊
+        walls = grid[1:-1, 1:-1] == 1
+        horizontal = (grid[1:-1, :-2] == 0) & (grid[1:-1, 2:] == 0)
+        vertical = (grid[:-2, 1:-1] == 0) & (grid[2:, 1:-1] == 0)
+        doors = walls & (horizontal | vertical) & (rng.random(walls.shape) < cls.door_ratio)
+        materials[1:-1, 1:-1][doors] = MATERIAL_DOOR
+        return materials
     
-    def _add_random_passages(self):
+    @property
+    def open_cells(self):
+        """所有通道单元格的扁平序号（int32数组视图）"""
+        if self._open_cells is None:
+            # 按行优先顺序重建通道单元格索引
+            self._open_cells = np.flatnonzero(self.array.ravel() == 0).astype(np.int32)
+            self._open_count = len(self._open_cells)
+            self._open_slots = None
+        return self._open_cells[:self._open_count]
+    
+    @property
+    def open_slots(self):
+        """每个单元格在open_cells中的位置（墙为-1）"""
+        if self._open_slots is None:
+            open_cells = self.open_cells
+            self._open_slots = np.full(self.width * self.height, -1, dtype=np.int32)
+            self._open_slots[open_cells] = np.arange(len(open_cells), dtype=np.int32)
+        return self._open_slots
+    
+    def _grid_changed(self):
+        """网格被修改：递增版本号并使可见集和压缩图失效"""
+        self.version += 1
+        self.visibility = {}
+        self._junctions = None
+    
+    @property
+    def junctions(self):
+        """路口和走廊组成的压缩图"""
+        if self._junctions is None:
+            self._junctions = JunctionGraph(self)
+        return self._junctions
+    
+    def set_cell(self, x, y, value):
+        """修改单元格（1为墙，0为通道）"""
+        index = y * self.width + x
+        if self.cells[index] == value:
+            return
+        
+        # 增量维护通道单元格索引：新通道追加到末尾，变成墙的单元格与末尾元素交换后删除；
+        # 索引必须在写入之前取得，否则首次使用时重建的索引已经包含这次修改
+        open_slots = self.open_slots
+        count = self._open_count
+        self.cells[index] = value
+        if value == 0:
+            if count == len(self._open_cells):
+                # 数组已满时按倍数扩容
+                grown = np.empty(max(16, 2 * count), dtype=np.int32)
+                grown[:count] = self._open_cells[:count]
+                self._open_cells = grown
+            self._open_cells[count] = index
+            open_slots[index] = count
+            self._open_count = count + 1
+        else:
+            slot = int(open_slots[index])
+            last = int(self._open_cells[count - 1])
+            self._open_cells[slot] = last
+            open_slots[last] = slot
+            open_slots[index] = -1
+            self._open_count = count - 1
+        self._grid_changed()
+    
+    @staticmethod
+    def _add_random_passages(cells, width, height, rng):
         """添加一些随机的通道以增加迷宫的复杂性"""
         # 添加额外的通道，打破一些墙壁
-        passages_to_add = (self.width * self.height) // 20  # 添加约5%的额外通道
+        passages_to_add = (width * height) // 20  # 添加约5%的额外通道
+        if width < 5 or height < 5:
+            return
         
-        for _ in range(passages_to_add):
-            # 选择一个随机的墙壁位置（不包括边缘）
-            x = random.randrange(2, self.width - 2)
-            y = random.randrange(2, self.height - 2)
-            
-            # 确保选择的是墙壁
-            if self.grid[y][x] == 1:
-                # 检查是否是连接两个通道的墙
-                horizontal_check = self.grid[y][x-1] == 0 and self.grid[y][x+1] == 0
-                vertical_check = self.grid[y-1][x] == 0 and self.grid[y+1][x] == 0
-                
-                if horizontal_check or vertical_check:
-                    self.grid[y][x] = 0  # 打通墙壁
+        # 一次性选出所有随机的墙壁位置（不包括边缘）
+        rng = np.random.default_rng(rng.randrange(2 ** 32))
+        x = rng.integers(2, width - 2, size=passages_to_add)
+        y = rng.integers(2, height - 2, size=passages_to_add)
+        
+        # 只打通连接两个通道的墙（按打通之前的网格判断）
+        grid = np.frombuffer(cells, dtype=np.uint8).reshape(height, width)
+        horizontal_check = (grid[y, x - 1] == 0) & (grid[y, x + 1] == 0)
+        vertical_check = (grid[y - 1, x] == 0) & (grid[y + 1, x] == 0)
+        carve = (grid[y, x] == 1) & (horizontal_check | vertical_check)
+        grid[y[carve], x[carve]] = 0  # 打通墙壁
     
     def _ensure_walls_at_edges(self):
         """确保迷宫边缘是墙"""
-        for x in range(self.width):
-            self.grid[0][x] = 1
-            self.grid[self.height - 1][x] = 1
-        
-        for y in range(self.height):
-            self.grid[y][0] = 1
-            self.grid[y][self.width - 1] = 1
+        self._array[0, :] = 1
+        self._array[-1, :] = 1
+        self._array[:, 0] = 1
+        self._array[:, -1] = 1
     
     def is_wall(self, x, y):
         """检查给定坐标是否是墙"""
         # 确保坐标在迷宫范围内
         if 0 <= x < self.width and 0 <= y < self.height:
-            return self.grid[int(y)][int(x)] == 1
+            return self.cells[int(y) * self.width + int(x)] == 1
         return True  # 迷宫外部视为墙
     
+    def flat_index(self, x, y):
+        """单元格 (x, y) 的扁平序号"""
+        return int(y) * self.width + int(x)
+    
+    def cell_at(self, index):
+        """扁平序号对应的单元格坐标 (x, y)"""
+        return index % self.width, index // self.width
+    
+    def is_wall_index(self, index):
+        """按扁平序号检查单元格是否是墙（不做边界检查，调用者保证序号有效）"""
+        return self.cells[index] == 1
+    
+    def open_neighbors(self, index):
+        """按扁平序号获取四个相邻单元格中的通道（迷宫边缘都是墙，内部单元格的邻居总是有效序号）"""
+        cells = self.cells
+        return [index + offset for offset in self.neighbor_offsets if cells[index + offset] == 0]
+    
+    def build_visibility(self, cells=None, batch_size=32):
+        """计算可见集：从通道单元格的中心和四个角附近向各个方向投射光线，记录经过的通道单元格（默认计算全部通道单元格）"""
+        if cells is None:
+            cells = self.open_cells
+        cells = np.asarray(cells, dtype=np.intp)
+        walls = (self.array == 1).ravel()
+        radius = self.visibility_range
+        window = 2 * radius + 1
+        
+        # 光线数量保证在可见集范围的边缘相邻光线的间距不超过半个单元格
+        ray_count = int(math.ceil(2 * math.pi * radius / 0.5))
+        angles = np.linspace(0, 2 * math.pi, ray_count, endpoint=False)
+        inset = 0.05
+        samples = np.array([(0.5, 0.5), (inset, inset), (1 - inset, inset),
+                            (inset, 1 - inset), (1 - inset, 1 - inset)])
+        
+        for first in range(0, len(cells), batch_size):
+            batch = cells[first:first + batch_size]
+            visible = np.zeros((len(batch), window * window), dtype=bool)
+            visible[:, radius * window + radius] = True
+            
+            shape = (len(batch), len(samples), ray_count)
+            sources = np.broadcast_to(np.arange(len(batch))[:, None, None], shape).ravel()
+            origin_x = np.broadcast_to((batch % self.width)[:, None, None] + samples[None, :, 0, None], shape).ravel()
+            origin_y = np.broadcast_to((batch // self.width)[:, None, None] + samples[None, :, 1, None], shape).ravel()
+            ray_angles = np.broadcast_to(angles, shape).ravel()
+            self._trace_visibility(visible, walls, batch % self.width, batch // self.width, sources,
+                                   origin_x, origin_y, np.cos(ray_angles), np.sin(ray_angles))
+            
+            rows = np.packbits(visible, axis=1, bitorder='little')
+            for index, row in zip(batch.tolist(), rows):
+                self.visibility[index] = row.tobytes()
+    
+    def _trace_visibility(self, visible, walls, source_x, source_y, sources, x, y, cos_a, sin_a):
+        """用DDA算法同时推进所有光线直到撞墙或离开可见集窗口，把经过的通道单元格标记为对源单元格可见"""
+        radius = self.visibility_range
+        window = 2 * radius + 1
+        map_x = x.astype(np.intp)
+        map_y = y.astype(np.intp)
+        step_x = np.where(cos_a > 0, 1, -1)
+        step_y = np.where(sin_a > 0, 1, -1)
+        with np.errstate(divide='ignore'):
+            delta_x = np.abs(1 / cos_a)
+            delta_y = np.abs(1 / sin_a)
+        side_x = np.where(cos_a > 0, map_x + 1 - x, x - map_x) * delta_x
+        side_y = np.where(sin_a > 0, map_y + 1 - y, y - map_y) * delta_y
+        
+        # 光线在窗口内的偏移（迷宫边缘都是墙，光线不会越出迷宫）
+        offset_x = map_x - source_x[sources] + radius
+        offset_y = map_y - source_y[sources] + radius
+        
+        while len(sources):
+            along_x = side_x < side_y
+            map_x = np.where(along_x, map_x + step_x, map_x)
+            map_y = np.where(along_x, map_y, map_y + step_y)
+            offset_x = np.where(along_x, offset_x + step_x, offset_x)
+            offset_y = np.where(along_x, offset_y, offset_y + step_y)
+            side_x = np.where(along_x, side_x + delta_x, side_x)
+            side_y = np.where(along_x, side_y, side_y + delta_y)
+            
+            active = ~walls[map_y * self.width + map_x]
+            active &= (offset_x >= 0) & (offset_x < window) & (offset_y >= 0) & (offset_y < window)
+            sources = sources[active]
+            map_x, map_y = map_x[active], map_y[active]
+            offset_x, offset_y = offset_x[active], offset_y[active]
+            step_x, step_y = step_x[active], step_y[active]
+            delta_x, delta_y = delta_x[active], delta_y[active]
+            side_x, side_y = side_x[active], side_y[active]
+            visible[sources, offset_y * window + offset_x] = True
+    
+    def _visible_from(self, a, b):
+        """单元格b（扁平序号）是否在单元格a的可见集中，a的可见集尚未计算时先计算"""
+        row = self.visibility.get(a)
+        if row is None:
+            self.build_visibility([a])
+            row = self.visibility[a]
+        window = 2 * self.visibility_range + 1
+        bit = (b // self.width - a // self.width + self.visibility_range) * window + \
+              (b % self.width - a % self.width + self.visibility_range)
+        return row[bit >> 3] >> (bit & 7) & 1 == 1
+    
+    def cells_visible(self, x1, y1, x2, y2):
+        """O(1)判断两个坐标所在的单元格之间是否可能互相看见（超出可见集范围、在墙内或迷宫外时无法判断，返回True）"""
+        if not (0 <= x1 < self.width and 0 <= y1 < self.height and 0 <= x2 < self.width and 0 <= y2 < self.height):
+            return True
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+        if abs(x2 - x1) > self.visibility_range or abs(y2 - y1) > self.visibility_range:
+            return True
+        a = y1 * self.width + x1
+        b = y2 * self.width + x2
+        if self.cells[a] or self.cells[b]:
+            return True
+        
+        # 光路可逆：任意一方的可见集中包含另一方即可
+        return self._visible_from(a, b) or self._visible_from(b, a)
+    
     def get_random_empty_position(self):
-        """获取一个随机的空位置（非墙）"""
-        empty_positions = []
-        for y in range(self.height):
-            for x in range(self.width):
-                if self.grid[y][x] == 0:  # 如果是通道
-                    empty_positions.append((x, y))
-        
-        if empty_positions:
-            return random.choice(empty_positions)
+        """获取一个随机的空位置（非墙），从通道单元格索引中O(1)均匀采样"""
+        open_cells = self.open_cells
+        if len(open_cells):
+            return self.cell_at(int(open_cells[random.randrange(len(open_cells))]))
         else:
             # 如果没有空位置（不太可能发生），返回中心位置
             return (self.width // 2, self.height // 2)
     
+    def get_random_empty_position_far_from(self, x, y, min_distance, attempts=32):
+        """随机获取一个与 (x, y) 的距离大于min_distance的空位置，不存在时返回None"""
+        # 排除的区域通常只占通道的一小部分，先直接拒绝采样
+        cells = self.open_cells
+        for _ in range(min(attempts, len(cells))):
+            cell_x, cell_y = self.cell_at(int(cells[random.randrange(len(cells))]))
+            if math.hypot(cell_x - x, cell_y - y) > min_distance:
+                return (cell_x, cell_y)
+        
+        # 多次未命中说明满足条件的单元格很少，只在这些单元格中均匀采样
+        far = cells[np.hypot(cells % self.width - x, cells // self.width - y) > min_distance]
+        if not len(far):
+            return None
+        return self.cell_at(int(far[random.randrange(len(far))]))
+    
     def get_wall_texture_index(self, x, y):
         """获取墙壁的纹理索引，用于视觉变化"""
-        # 使用坐标的哈希值来确定纹理索引，这样同一位置的墙总是有相同的纹理
-        hash_value = hash((int(x), int(y)))
-        return abs(hash_value) % 3  # 假设有3种不同的墙壁纹理
\ No newline at end of file
+        # 纹理索引平面由种子决定，同一位置的墙总是有相同的纹理
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.textures[int(y) * self.width + int(x)]
+        return 0
+    
+    def save(self, path):
+        """把迷宫写入二进制文件（先写临时文件再替换，其他进程不会读到写了一半的文件）"""
+        algorithm = self.algorithm.encode('ascii')
+        header = MAZE_FILE_HEADER.pack(MAZE_FILE_MAGIC, MAZE_FILE_VERSION, MAZE_FILE_HEADER_SIZE,
+                                       self.width, self.height, self.seed, algorithm)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(header.ljust(MAZE_FILE_HEADER_SIZE, b'\x00'))
+            f.write(self.cells)
+            f.write(self.textures)
+        os.replace(temp_path, path)
+    
+    @classmethod
+    def load(cls, path, writable=True):
+        """把迷宫文件映射到内存：writable为True时修改只作用于本进程（写时复制），否则网格只读；
+        未修改的页面在所有打开同一文件的进程之间共享"""
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY if writable else mmap.ACCESS_READ)
+        
+        magic, version, header_size, width, height, seed, algorithm = \
+            MAZE_FILE_HEADER.unpack_from(data)
+        if magic != MAZE_FILE_MAGIC or version != MAZE_FILE_VERSION:
+            data.close()
+            raise ValueError(f'不是有效的迷宫文件: {path}')
+        count = width * height
+        if len(data) < header_size + 2 * count:
+            data.close()
+            raise ValueError(f'迷宫文件不完整: {path}')
+        
+        maze = cls.__new__(cls)
+        maze.seed = seed
+        maze.algorithm = algorithm.rstrip(b'\x00').decode('ascii')
+        maze.random = random.Random(seed)
+        maze.mmap = data  # 保持映射打开，直到迷宫对象被释放
+        view = memoryview(data)
+        maze._init_storage(width, height, view[header_size:header_size + count],
+                           view[header_size + count:header_size + 2 * count])
+        
+        maze._grid_changed()
+        return maze
+    
+    @classmethod
+    def cached(cls, width, height, seed, algorithm='dfs', cache_dir='maze_cache'):
+        """按 (种子, 尺寸, 算法) 从缓存目录载入迷宫，缓存中没有时生成并写入缓存"""
+        path = os.path.join(cache_dir, f'{algorithm}_{width}x{height}_{seed}.maze')
+        if os.path.exists(path):
+            return cls.load(path)
+        maze = cls(width, height, seed, algorithm)
+        os.makedirs(cache_dir, exist_ok=True)
+        maze.save(path)
+        return maze
\ No newline at end of file
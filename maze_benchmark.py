@@ -0,0 +1,98 @@
+"""迷宫生成性能基准测试
+
+对每种生成算法在一系列边长上生成迷宫（包括随机通道和纹理平面；可见集按需计算，不计入生成耗时），
+以JSON格式输出每个边长的生成耗时（秒），安装了matplotlib时可以把耗时随边长的变化画成图。
+
+用法：python maze_benchmark.py [--sizes 50 100 200 400 800 1600 2000] [--plot generation.png]
+"""
+import argparse
+import json
+import platform
+import time
+
+import numpy as np
+
+from maze import Maze
+
+def time_generation(algorithm, size, seed, repeat):
+    """生成repeat次同样的迷宫，返回每次的耗时"""
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        Maze(size, size, seed + i, algorithm)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def plot(report, path):
+    """把各算法的生成耗时随边长的变化画成对数坐标图"""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        raise SystemExit('绘图需要matplotlib：pip install matplotlib')
+    
+    figure, axes = plt.subplots(figsize=(7, 4.5))
+    for algorithm, results in report['algorithms'].items():
+        sizes = [int(size) for size in results]
+        axes.plot(sizes, [results[str(size)]['median'] for size in sizes], marker='o', label=algorithm)
+    axes.set_xscale('log')
+    axes.set_yscale('log')
+    axes.set_xlabel('maze size (cells per side)')
+    axes.set_ylabel('generation time (s)')
+    axes.grid(True, which='both', alpha=0.3)
+    axes.legend()
+    figure.tight_layout()
+    figure.savefig(path, dpi=120)
+
+def main():
+    parser = argparse.ArgumentParser(description='The Backrooms 迷宫生成基准测试')
+    parser.add_argument('--algorithm', choices=sorted(Maze.generators), action='append',
+                        help='只测试指定算法（可重复指定）')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 100, 200, 400, 800, 1600, 2000],
+                        help='迷宫边长')
+    parser.add_argument('--repeat', type=int, default=3, help='每个边长生成的次数')
+    parser.add_argument('--seed', type=int, default=1234, help='随机种子')
+    parser.add_argument('--max-seconds', type=float, default=5.0,
+                        help='某个算法单次生成超过该时间后跳过更大的边长')
+    parser.add_argument('--plot', metavar='PATH', help='把耗时曲线画到图片文件中（需要matplotlib）')
+    parser.add_argument('--output', help='把JSON结果写入文件而不是标准输出')
+    args = parser.parse_args()
+    
+    report = {
+        'config': {
+            'sizes': args.sizes,
+            'repeat': args.repeat,
+            'seed': args.seed
+        },
+        'machine': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'processor': platform.processor() or platform.machine()
+        },
+        'algorithms': {}
+    }
+    for algorithm in args.algorithm or sorted(Maze.generators):
+        results = report['algorithms'][algorithm] = {}
+        for size in sorted(args.sizes):
+            samples = time_generation(algorithm, size, args.seed, args.repeat)
+            results[str(size)] = {
+                'median': round(float(np.median(samples)), 4),
+                'min': round(min(samples), 4),
+                'cells_per_second': round(size * size / max(float(np.median(samples)), 1e-9))
+            }
+            if min(samples) > args.max_seconds:
+                break
+    
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+    
+    if args.plot:
+        plot(report, args.plot)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
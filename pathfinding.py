@@ -0,0 +1,136 @@
+import heapq
+import math
+import time
+from collections import OrderedDict
+
+from profiler import Profiler
+
+class PathFinder:
+    """基于二叉堆的A*寻路（有限迷宫在路口压缩图上搜索），按 (起点单元格, 终点单元格) 缓存路径并按最近最少使用（LRU）淘汰，迷宫被修改后缓存全部失效"""
+    
+    def __init__(self, maze, profiler=None, cache_size=256, max_nodes=4096):
+        self.maze = maze  # 迷宫引用
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.cache_size = cache_size  # 最多缓存的路径数量
+        self.max_nodes = max_nodes  # 单次搜索最多展开的节点数，超过时视为找不到路径
+        
+        # 键为 (起点, 终点)，值为路径经过的各单元格中心（不含起点）；
+        # 有限迷宫的键是单元格的扁平序号，无限迷宫的键是单元格坐标
+        self.entries = OrderedDict()
+        self.maze_version = maze.version
+        
+        # 缓存和搜索统计
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nodes_expanded = 0
+        self.search_ms = 0.0
+    
+    def find_path(self, start_x, start_y, goal_x, goal_y):
+        """寻找从起点所在单元格到终点所在单元格的路径，返回经过的各单元格中心（不含起点），找不到时返回空列表"""
+        if self.maze.version != self.maze_version:
+            self.clear()
+            self.maze_version = self.maze.version
+        
+        start_x, start_y = math.floor(start_x), math.floor(start_y)
+        goal_x, goal_y = math.floor(goal_x), math.floor(goal_y)
+        
+        # 如果起点或终点是墙，返回空路径
+        if self.maze.is_wall(start_x, start_y) or self.maze.is_wall(goal_x, goal_y):
+            return []
+        
+        if self.maze.endless:
+            key = ((start_x, start_y), (goal_x, goal_y))
+        else:
+            key = (self.maze.flat_index(start_x, start_y), self.maze.flat_index(goal_x, goal_y))
+        path = self.entries.get(key)
+        if path is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.profiler.count('path_cache.hit')
+            return list(path)
+        
+        self.misses += 1
+        self.profiler.count('path_cache.miss')
+        start = time.perf_counter()
+        if self.maze.endless:
+            path = self._search(key[0], key[1], self._coordinate_neighbors, self._coordinate_heuristic)
+            path = tuple((x + 0.5, y + 0.5) for x, y in path)
+        else:
+            # 有限迷宫在路口和走廊组成的压缩图上搜索，只展开路口和死胡同
+            path, expanded = self.maze.junctions.find_path(key[0], key[1], self.max_nodes)
+            self.nodes_expanded += expanded
+            path = tuple((index % self.maze.width + 0.5, index // self.maze.width + 0.5) for index in path)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.search_ms += elapsed
+        self.profiler.add('pathfinding', elapsed)
+        
+        self.entries[key] = path
+        while len(self.entries) > self.cache_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return list(path)
+    
+    def _search(self, start, goal, neighbors, heuristic):
+        """A*搜索：开放列表是按 (f, h) 排序的二叉堆，过期的堆项在弹出时跳过，返回不含起点的节点列表"""
+        g_score = {start: 0}
+        came_from = {}
+        open_heap = [(heuristic(start, goal), heuristic(start, goal), start)]
+        expanded = 0
+        
+        while open_heap:
+            f, h, current = heapq.heappop(open_heap)
+            if current == goal:
+                # 重建路径
+                path = []
+                while current in came_from:
+                    path.append(current)
+                    current = came_from[current]
+                self.nodes_expanded += expanded
+                return path[::-1]
+            
+            # 同一节点可能以更小的代价被重新加入堆中，旧的堆项直接跳过
+            g = g_score[current]
+            if f - h > g:
+                continue
+            expanded += 1
+            if expanded > self.max_nodes:
+                break
+            
+            for neighbor in neighbors(current):
+                tentative_g_score = g + 1
+                if tentative_g_score < g_score.get(neighbor, tentative_g_score + 1):
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    h = heuristic(neighbor, goal)
+                    heapq.heappush(open_heap, (tentative_g_score + h, h, neighbor))
+        
+        self.nodes_expanded += expanded
+        return []
+    
+    def _coordinate_neighbors(self, cell):
+        """单元格坐标四个方向上不是墙的相邻单元格"""
+        x, y = cell
+        return [(x + dx, y + dy) for dx, dy in ((0, -1), (1, 0), (0, 1), (-1, 0))
+                if not self.maze.is_wall(x + dx, y + dy)]
+    
+    def _coordinate_heuristic(self, cell, goal):
+        """单元格坐标之间的曼哈顿距离"""
+        return abs(cell[0] - goal[0]) + abs(cell[1] - goal[1])
+    
+    def clear(self):
+        """清空缓存"""
+        self.entries.clear()
+    
+    def stats(self):
+        """获取缓存和搜索统计信息"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self.entries),
+            'nodes_expanded': self.nodes_expanded,
+            'search_ms': round(self.search_ms, 3)
+        }
\ No newline at end of file
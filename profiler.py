@@ -0,0 +1,151 @@
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+class _Section:
+    """单个具名计时器，作为上下文管理器使用"""
+    __slots__ = ('profiler', 'name', 'start')
+    
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.add(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+class _NullSection:
+    """计时关闭时使用的空上下文管理器，几乎没有开销"""
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_SECTION = _NullSection()
+
+class Profiler:
+    """按名称统计各子系统每帧耗时的轻量级计时器"""
+    
+    def __init__(self, enabled=False, history_size=240):
+        self.enabled = enabled  # 关闭时所有计时器都直接返回空上下文
+        self.overlay_visible = False  # 是否在屏幕上显示性能面板
+        self.enabled_before_overlay = enabled  # 显示性能面板之前的计时开关，隐藏面板时恢复
+        
+        # 当前帧各计时器的累计耗时（毫秒）
+        self.current = {}
+        
+        # 最近若干帧的记录（环形缓冲区），每项为 {计时器名称: 耗时}
+        self.frames = deque(maxlen=history_size)
+        
+        # 具名计数器（例如缓存命中次数），从开启计时起累计
+        self.counters = {}
+        
+        # 复用的计时器对象，避免每次计时都创建新对象
+        self._sections = {}
+    
+    def section(self, name):
+        """获取一个具名计时器：with profiler.section('walls'): ..."""
+        if not self.enabled:
+            return _NULL_SECTION
+        section = self._sections.get(name)
+        if section is None:
+            section = self._sections[name] = _Section(self, name)
+        return section
+    
+    def add(self, name, ms):
+        """把一段耗时计入当前帧的指定计时器"""
+        if self.enabled:
+            self.current[name] = self.current.get(name, 0.0) + ms
+    
+    def count(self, name, amount=1):
+        """累加一个具名计数器"""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def end_frame(self):
+        """结束当前帧，把本帧的记录放入环形缓冲区"""
+        if self.enabled and self.current:
+            self.frames.append(self.current)
+            self.current = {}
+    
+    def toggle_overlay(self):
+        """切换性能面板的显示（显示时自动开启计时，隐藏时恢复原来的计时开关）"""
+        self.overlay_visible = not self.overlay_visible
+        if self.overlay_visible:
+            self.enabled_before_overlay = self.enabled
+            self.enabled = True
+        else:
+            self.enabled = self.enabled_before_overlay
+    
+    def names(self):
+        """环形缓冲区中出现过的所有计时器名称"""
+        names = []
+        for frame in self.frames:
+            for name in frame:
+                if name not in names:
+                    names.append(name)
+        return names
+    
+    def stats(self):
+        """计算每个计时器在环形缓冲区中的平均值、最大值和最近一帧的耗时"""
+        result = {}
+        for name in self.names():
+            samples = [frame.get(name, 0.0) for frame in self.frames]
+            result[name] = {
+                'last': samples[-1],
+                'mean': sum(samples) / len(samples),
+                'max': max(samples)
+            }
+        return result
+    
+    def draw_overlay(self, screen, font, position=(10, 70)):
+        """在屏幕上绘制性能面板"""
+        if not self.overlay_visible:
+            return
+        
+        # 每行为 名称、最近一帧、平均值、最大值，数值列右对齐
+        rows = [('timer', 'last', 'mean', 'max (ms)')]
+        for name, stat in self.stats().items():
+            rows.append((name, f"{stat['last']:.2f}", f"{stat['mean']:.2f}", f"{stat['max']:.2f}"))
+        
+        # 计数器列在计时器下方，只显示累计值
+        for name, value in self.counters.items():
+            rows.append((name, str(value), '', ''))
+        
+        widths = [max(font.size(row[i])[0] for row in rows) + 12 for i in range(4)]
+        line_height = font.get_linesize()
+        panel = pygame.Surface((sum(widths) + 10, line_height * len(rows) + 10), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 160))
+        for i, row in enumerate(rows):
+            x = 5
+            for j, text in enumerate(row):
+                label = font.render(text, True, (255, 255, 255))
+                offset = 0 if j == 0 else widths[j] - 12 - label.get_width()
+                panel.blit(label, (x + offset, 5 + i * line_height))
+                x += widths[j]
+        screen.blit(panel, position)
+    
+    def dump(self, path):
+        """把环形缓冲区中的记录写入文件，扩展名为.json时写JSON，否则写CSV"""
+        names = self.names()
+        if path.endswith('.json'):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'timers': names, 'frames': list(self.frames), 'stats': self.stats(),
+                           'counters': self.counters}, f, indent=2)
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['frame_index'] + names)
+                for i, frame in enumerate(self.frames):
+                    writer.writerow([i] + [round(frame.get(name, 0.0), 4) for name in names])
\ No newline at end of file
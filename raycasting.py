@@ -1,17 +1,46 @@
 import pygame
 import math
 import random  # 将random导入移到文件开头
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import numpy as np
+from floor_caster import FloorCaster
+from fog import FogTable
+from layers import BackgroundLayers
+from profiler import Profiler
+from resolution import ResolutionScaler
+from sprite_cache import SpriteCache
+from texture_store import TextureStore
 
 class Raycaster:
-    def __init__(self, maze):
+    def __init__(self, maze, profiler=None):
         self.maze = maze
         
+        # 各渲染阶段的计时器（默认关闭）
+        self.profiler = profiler if profiler is not None else Profiler()
+        
         # 渲染参数
         self.fov = math.pi / 3  # 视场角（60度）
         self.half_fov = self.fov / 2
         self.num_rays = 320  # 光线数量
         self.max_depth = 20  # 最大深度
+        self.sprite_near = 0.3  # 实体精灵的近裁剪面（沿视线方向的深度），更近的实体不绘制
+        self.sprite_max_scale = 2  # 实体精灵宽度最多为屏幕高度的多少倍
         self.delta_angle = self.fov / self.num_rays
+        self._build_ray_tables()
+        
+        # 动态分辨率（默认关闭）
+        self.base_num_rays = self.num_rays
+        self.scaler = None
+        self.render_target = None
+        
+        # 按列分块并行渲染的工作线程（默认单线程）
+        self.workers = 1
+        self.executor = None
+        
+        # 荧光灯滚动动画使用的时间来源（毫秒）
+        self.time_source = pygame.time.get_ticks
         
         # 纹理尺寸
         self.texture_width = 64
@@ -22,15 +51,123 @@ class Raycaster:
         # 墙壁纹理
         self.wall_textures = self._create_wall_textures()
         
-        # 实体纹理
+        # 墙壁纹理的数组形式及其mipmap链，第0级形状为 (纹理数, 宽, 高, 3)，供向量化光栅化使用
+        self.wall_store = TextureStore(np.stack(
+            [pygame.surfarray.array3d(texture) for texture in self.wall_textures]))
+        self.wall_texture_arrays = self.wall_store.levels[0]
+        
+        # 实体纹理及其mipmap链（RGBA）
         self.entity_textures = self._create_entity_textures()
+        self.entity_store = TextureStore(np.stack(
+            [self._surface_to_array(texture) for texture in self.entity_textures]))
         
         # 地板和天花板颜色 - 更新为更符合图片的颜色
         self.floor_color = (220, 210, 180)  # 米色地板
         self.ceiling_color = (240, 240, 240)  # 白色天花板（荧光灯效果）
+        self.fog_color = (50, 45, 30)  # 雾的颜色（暗黄色）
+        
+        # 天花板、地板、荧光灯和全局雾图层（按分辨率缓存）
+        self.layers = BackgroundLayers(self.ceiling_color, self.floor_color)
+        
+        # 带纹理的地板和天花板（关闭时使用纯色背景和滚动的荧光灯）
+        self.textured_planes = True
+        self.floor_caster = FloorCaster(self.fov, self.max_depth, self.fog_color)
+        
+        # 预计算的雾效果查找表（墙壁和实体共用），每个mipmap等级一张，名称为 'walls.0' 等
+        self.fog = FogTable(self.fog_color, self.max_depth)
+        for level, textures in enumerate(self.wall_store.levels):
+            self.fog.add(f'walls.{level}', textures)
+        for level, textures in enumerate(self.entity_store.levels):
+            self.fog.add(f'entities.{level}', textures)
+        
+        # 已缩放并应用雾效果的实体精灵缓存
+        self.sprite_cache = SpriteCache()
+        
+        # 迷宫的数组视图（用于批量光线投射）；无限迷宫只截取玩家周围的窗口，
+        # grid_origin为窗口左上角的世界坐标
+        self.grid_origin = (0, 0)
+        self.window_margin = 4  # 玩家离开窗口中心超过该距离时重新截取窗口
+        self._build_maze_arrays()
         
         # 光线投射结果缓存
-        self.ray_casts = []
+        self.ray_casts = None
+        
+        # 帧间复用光线结果：上一次投射时的 (x, y, 起始光线角度序号, 光线数量)
+        self.ray_cache_pose = None
+        self.ray_cache_hits = 0  # 位姿完全相同，直接复用
+        self.ray_cache_partial = 0  # 只发生旋转，只补投新露出的列
+        self.ray_cache_misses = 0  # 位置改变，重新投射所有光线
+        self.rays_cast = 0  # 实际投射的光线总数
+        
+        # 每个屏幕列的墙壁距离（深度缓冲区），用于逐列裁剪实体
+        self.z_buffer = None
+        self.view_angle = None  # 上一帧光线实际使用的（对齐到网格的）视线角度
+    
+    def set_num_rays(self, num_rays):
+        """修改光线数量并重建预计算表"""
+        self.num_rays = num_rays
+        self.delta_angle = self.fov / self.num_rays
+        self._build_ray_tables()
+        self.ray_cache_pose = None
+    
+    def enable_dynamic_resolution(self, target_ms=12.0, min_scale=0.4, max_scale=1.0):
+        """开启动态分辨率：根据每帧的渲染耗时调整内部分辨率和光线数量"""
+        self.scaler = ResolutionScaler(target_ms, min_scale, max_scale)
+    
+    def disable_dynamic_resolution(self):
+        """关闭动态分辨率并恢复默认的光线数量"""
+        self.scaler = None
+        self.render_target = None
+        self.set_num_rays(self.base_num_rays)
+    
+    def set_workers(self, workers):
+        """设置按列分块渲染的工作线程数量，1表示单线程渲染"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.workers = max(1, int(workers))
+        if self.workers > 1:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='raycaster')
+    
+    def close(self):
+        """关闭渲染线程池"""
+        self.set_workers(1)
+    
+    def _column_tiles(self, count):
+        """把 [0, count) 划分为与工作线程数量相同的连续分块"""
+        tiles = min(self.workers, count)
+        bounds = np.linspace(0, count, tiles + 1).astype(int).tolist()
+        return list(zip(bounds[:-1], bounds[1:]))
+    
+    def _run_tiles(self, func, count):
+        """对每个分块调用func(start, end)，多线程时并行执行，按分块顺序返回结果"""
+        tiles = self._column_tiles(count)
+        if self.executor is None or len(tiles) <= 1:
+            return [func(start, end) for start, end in tiles]
+        return list(self.executor.map(lambda tile: func(*tile), tiles))
+    
+    def _build_ray_tables(self):
+        """根据视场角和光线数量预计算每条光线的角度偏移、正余弦和鱼眼修正表"""
+        self.ray_offsets = -self.half_fov + np.arange(self.num_rays) * self.delta_angle
+        self.ray_cos = np.cos(self.ray_offsets)
+        self.ray_sin = np.sin(self.ray_offsets)
+        # 鱼眼修正：投影平面距离 = 光线距离 * cos(光线与视线的夹角)
+        self.fisheye_table = self.ray_cos.copy()
+    
+    def _build_maze_arrays(self, x=0.0, y=0.0):
+        """构建迷宫网格和墙壁纹理索引的数组视图（无限迷宫截取以 (x, y) 为中心的窗口）"""
+        if self.maze.endless:
+            # 玩家离窗口中心不超过window_margin时，长度为max_depth的光线不会越出窗口
+            radius = int(math.ceil(self.max_depth)) + self.window_margin + 1
+            origin = (int(math.floor(x)) - radius, int(math.floor(y)) - radius)
+            self.grid_origin = origin
+            self.grid_array = self.maze.get_region(origin[0], origin[1], 2 * radius + 1, 2 * radius + 1)
+            self.texture_index_array = self.maze.get_texture_region(origin[0], origin[1], 2 * radius + 1, 2 * radius + 1)
+        else:
+            self.grid_array = self.maze.array
+            self.texture_index_array = self.maze.texture_array
+        self.ray_cache_pose = None
+        self.maze_version = self.maze.version
     
     def _create_wall_textures(self):
         """创建墙壁纹理"""
@@ -73,6 +210,27 @@ class Raycaster:
         
         textures.append(texture3)
         
+        # 纹理4：从天花板渗下水渍的墙壁
+        texture4 = texture1.copy()
+        for _ in range(6):
+            x = random.randint(0, self.texture_width - 12)
+            length = random.randint(self.texture_height // 4, self.texture_height * 3 // 4)
+            pygame.draw.ellipse(texture4, (215, 198, 140), (x, -length // 2, random.randint(6, 12), length))
+        pygame.draw.rect(texture4, (205, 188, 130), (0, 0, self.texture_width, 3))
+        
+        textures.append(texture4)
+        
+        # 纹理5：关着的门
+        texture5 = texture1.copy()
+        door_rect = pygame.Rect(self.texture_width // 4, self.texture_height // 8,
+                                self.texture_width // 2, self.texture_height * 7 // 8)
+        pygame.draw.rect(texture5, (150, 130, 95), door_rect.inflate(4, 0))  # 门框
+        pygame.draw.rect(texture5, (185, 165, 120), door_rect)
+        pygame.draw.rect(texture5, (170, 150, 108), door_rect.inflate(-10, -14), 1)  # 门板
+        pygame.draw.circle(texture5, (120, 110, 90), (door_rect.right - 5, door_rect.centery), 2)  # 门把手
+        
+        textures.append(texture5)
+        
         return textures
     
     def _create_entity_textures(self):
@@ -136,316 +294,458 @@ class Raycaster:
         
         return textures
     
-    def render(self, screen, player):
+    def render(self, screen, player, entities=()):
         """渲染3D视图"""
-        screen_width, screen_height = screen.get_size()
+        if self.scaler is None:
+            self._render_frame(screen, player, entities)
+            return
+        
+        start = time.perf_counter()
         
-        # 清空光线投射结果缓存
-        self.ray_casts = []
+        # 按当前比例选择内部分辨率，每个内部像素列投射一条光线
+        size = self.scaler.render_size(screen.get_size())
+        if size == screen.get_size():
+            target = screen
+        else:
+            if self.render_target is None or self.render_target.get_size() != size:
+                self.render_target = pygame.Surface(size, 0, 32)
+            target = self.render_target
+        if self.num_rays != size[0]:
+            self.set_num_rays(size[0])
         
-        # 清除屏幕
-        screen.fill(self.ceiling_color, (0, 0, screen_width, screen_height // 2))
-        screen.fill(self.floor_color, (0, screen_height // 2, screen_width, screen_height // 2))
+        self._render_frame(target, player, entities)
         
-        # 渲染荧光灯
-        self._render_ceiling_lights(screen)
+        # 一次性放大到窗口分辨率
+        if target is not screen:
+            with self.profiler.section('upscale'):
+                pygame.transform.scale(target, screen.get_size(), screen)
+        
+        self.scaler.record((time.perf_counter() - start) * 1000)
+    
+    def _render_frame(self, screen, player, entities):
+        """在给定表面上渲染完整的一帧"""
+        # 迷宫网格被修改过时重建数组视图
+        if self.maze_version != self.maze.version or self._window_stale(player):
+            self._build_maze_arrays(player.x, player.y)
+        
+        # 先投射所有光线（尽量复用上一帧的结果），地板和天花板可以跳过被墙壁完全覆盖的行
+        with self.profiler.section('wall_cast'):
+            center = self._cast_coherent(player.x - self.grid_origin[0], player.y - self.grid_origin[1],
+                                         player.angle)
+        
+        # 绘制天花板、地板和荧光灯
+        with self.profiler.section('background'):
+            if self.textured_planes:
+                self.floor_caster.draw(screen, player.x, player.y, player.angle,
+                                       int(player.get_head_bob_offset() * 10),
+                                       self._covered_rows(screen.get_height()))
+            else:
+                self.layers.draw_background(screen, self.time_source())
         
         # 渲染墙壁
-        self._render_walls(screen, player)
+        self._render_walls(screen, player, center)
+        self.view_angle = center
         
         # 渲染实体
-        self._render_entities(screen, player)
+        with self.profiler.section('sprites'):
+            self._render_entities(screen, player, entities, center)
         
         # 应用全局雾效果
-        self._apply_fog_effect(screen)
+        with self.profiler.section('fog'):
+            self.layers.apply_fog(screen)
     
-    def _render_ceiling_lights(self, screen):
-        """渲染天花板上的荧光灯"""
-        screen_width = screen.get_width()
-        screen_height = screen.get_height()
-        ceiling_height = screen_height // 2
-        
-        # 每隔一定距离绘制一个荧光灯
-        light_spacing = 120
-        light_width = 80
-        light_height = 10
-        
-        for x in range(0, screen_width + light_spacing, light_spacing):
-            # 计算灯的位置
-            light_x = x - (pygame.time.get_ticks() // 50) % light_spacing
-            
-            # 绘制荧光灯
-            light_rect = pygame.Rect(light_x - light_width // 2, ceiling_height // 2 - light_height // 2, 
-                                    light_width, light_height)
-            
-            # 只绘制在屏幕内的灯
-            if light_rect.right > 0 and light_rect.left < screen_width:
-                # 绘制灯的主体
-                pygame.draw.rect(screen, (255, 255, 255), light_rect)
-                
-                # 绘制灯的发光效果
-                for i in range(1, 4):
-                    glow_rect = light_rect.inflate(i * 4, i * 2)
-                    glow_color = (255, 255, 255, 100 - i * 30)
-                    glow_surface = pygame.Surface((glow_rect.width, glow_rect.height), pygame.SRCALPHA)
-                    pygame.draw.rect(glow_surface, glow_color, (0, 0, glow_rect.width, glow_rect.height))
-                    screen.blit(glow_surface, glow_rect)
+    def _window_stale(self, player):
+        """无限迷宫中玩家是否已离开当前窗口的中心区域"""
+        if not self.maze.endless:
+            return False
+        radius = self.grid_array.shape[1] // 2
+        return (abs(player.x - self.grid_origin[0] - radius) > self.window_margin or
+                abs(player.y - self.grid_origin[1] - radius) > self.window_margin)
     
-    def _render_walls(self, screen, player):
-        """渲染墙壁"""
-        screen_width, screen_height = screen.get_size()
-        
+    def _covered_rows(self, screen_height):
+        """地平线上下各有多少行在每一列都被墙壁覆盖（按最远的光线保守估计）"""
+        farthest = float(self.ray_casts['distance'].max())
+        if not math.isfinite(farthest):
+            return 0
+        return max(0, int((screen_height * 0.8) / max(farthest, 1e-6)) // 2 - 1)
+    
+    def _render_walls(self, screen, player, center):
+        """根据self.ray_casts中的光线结果渲染墙壁，center为光线实际使用的视线角度"""
         # 获取玩家的头部摇晃偏移量
         head_bob = player.get_head_bob_offset()
         
-        # 投射光线
-        ray_angle = player.angle - self.half_fov
+        # 修正鱼眼效果（光线角度对齐到网格后，与视线方向还有一个小的残差角）
+        residual = center - player.angle
+        fisheye = self.fisheye_table * math.cos(residual) - self.ray_sin * math.sin(residual)
+        distances = self.ray_casts['distance'] * fisheye
+        texture_indices = self.ray_casts['texture_index']
+        texture_positions = self.ray_casts['texture_pos']
         
-        for ray in range(self.num_rays):
-            # 规范化角度
-            ray_angle %= 2 * math.pi
-            
-            # 投射单个光线
-            result = self._cast_ray(player.x, player.y, ray_angle)
-            self.ray_casts.append(result)
-            
-            # 计算投影平面距离以修正鱼眼效果
-            cos_angle = player.angle - ray_angle
-            cos_angle %= 2 * math.pi
-            if cos_angle > math.pi:
-                cos_angle = 2 * math.pi - cos_angle
-            dist = result['distance'] * math.cos(cos_angle)
-            
-            # 计算墙壁高度
-            wall_height = int((screen_height * 0.8) / dist) if dist > 0 else screen_height
-            
-            # 应用头部摇晃效果
-            bob_offset = int(head_bob * 10)
-            
-            # 计算墙壁顶部和底部位置
-            wall_top = max(0, (screen_height // 2) - (wall_height // 2) + bob_offset)
-            wall_bottom = min(screen_height, (screen_height // 2) + (wall_height // 2) + bob_offset)
-            
-            # 计算墙壁在屏幕上的位置
-            wall_pos = int(ray / self.num_rays * screen_width)
-            wall_width = int(screen_width / self.num_rays) + 1  # +1 确保没有间隙
-            
-            # 获取纹理
-            texture_index = result['texture_index']
-            texture = self.wall_textures[texture_index]
-            
-            # 计算纹理X坐标
-            texture_x = int(result['texture_pos'] * self.texture_width)
-            
-            # 绘制墙壁条带
-            wall_strip = pygame.Surface((1, wall_bottom - wall_top))
-            for y in range(wall_bottom - wall_top):
-                # 计算纹理Y坐标
-                texture_y = int(y / (wall_bottom - wall_top) * self.texture_height)
-                
-                # 获取纹理颜色
-                color = texture.get_at((texture_x, texture_y))
-                
-                # 根据距离添加雾效果
-                fog_factor = min(1.0, dist / self.max_depth)
-                color = self._apply_fog(color, fog_factor)
-                
-                # 设置像素颜色
-                wall_strip.set_at((0, y), color)
-            
-            # 绘制墙壁条带到屏幕
-            screen.blit(pygame.transform.scale(wall_strip, (wall_width, wall_bottom - wall_top)), (wall_pos, wall_top))
-            
-            # 增加光线角度
-            ray_angle += self.delta_angle
-    
-    def _render_entities(self, screen, player):
-        """渲染所有实体"""
-        # 这个方法会被游戏主循环调用，传入所有实体
-        # 在这里我们只是定义一个空方法，实际的实体渲染在render_entity方法中实现
-        pass
-    
-    def _apply_fog_effect(self, screen):
-        """应用全局雾效果"""
-        # 创建一个带有透明度的雾效果表面
-        fog_surface = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
-        fog_color = (220, 220, 200, 30)  # 淡黄色雾效果，轻微透明
-        fog_surface.fill(fog_color)
-        
-        # 将雾效果表面混合到屏幕上
-        screen.blit(fog_surface, (0, 0))
+        # 应用头部摇晃效果
+        bob_offset = int(head_bob * 10)
+        
+        with self.profiler.section('wall_raster'):
+            self._rasterize_walls(screen, distances, texture_indices, texture_positions, bob_offset)
     
-    def render_entity(self, screen, player, entity):
-        """渲染实体"""
+    def _rasterize_walls(self, screen, distances, texture_indices, texture_positions, bob_offset):
+        """通过surfarray一次性向帧缓冲区写入所有墙壁像素"""
         screen_width, screen_height = screen.get_size()
         
-        # 计算实体相对于玩家的位置
-        dx = entity.x - player.x
-        dy = entity.y - player.y
-        
-        # 计算实体与玩家的距离
-        dist = math.sqrt(dx*dx + dy*dy)
+        # 每个屏幕列对应的光线
+        rays = (np.arange(screen_width) * self.num_rays) // screen_width
+        dist = distances[rays]
+        self.z_buffer = dist
+        
+        # 计算每列墙壁的高度和（未裁剪的）顶部、底部位置
+        with np.errstate(divide='ignore'):
+            wall_heights = np.where(dist > 0, (screen_height * 0.8) / dist, screen_height)
+        wall_heights = np.minimum(wall_heights, screen_height * 64).astype(np.int64)
+        wall_tops = (screen_height // 2) - (wall_heights // 2) + bob_offset
+        wall_bottoms = (screen_height // 2) + (wall_heights // 2) + bob_offset
+        
+        # 根据墙壁的投影高度选择mipmap等级，远处的墙壁从更小的纹理中采样
+        mip_levels = self.wall_store.level_for(wall_heights)
+        
+        # 从雾效果查找表中按列取出已应用雾效果的纹理列，形状为 (列数, 纹理高, 3)，
+        # 第i级的纹理列只占用前 纹理高/2^i 行
+        texture_indices = texture_indices[rays]
+        texture_positions = texture_positions[rays]
+        columns = np.empty((screen_width, self.texture_height, 3), dtype=np.uint8)
+        for level in np.unique(mip_levels).tolist():
+            selected = np.flatnonzero(mip_levels == level)
+            mip_width, mip_height = self.wall_store.level_size(level)
+            name = f'walls.{level}'
+            texture_x = np.minimum((texture_positions[selected] * mip_width).astype(np.intp), mip_width - 1)
+            fog_levels = self.fog.bucket(name, dist[selected])
+            columns[selected, :mip_height] = self.fog.tables[name][texture_indices[selected], fog_levels, texture_x]
+        
+        if screen.get_bytesize() == 4:
+            # 32位表面：先把颜色列打包成像素值，再按整数采样
+            columns = TextureStore.map_colors(screen, columns)
+            frame = pygame.surfarray.pixels2d(screen)
+        else:
+            frame = pygame.surfarray.pixels3d(screen)
         
-        # 如果实体太远，不渲染
-        if dist > self.max_depth:
+        # 各分块只写入帧缓冲区中互不重叠的列
+        self._run_tiles(partial(self._rasterize_columns, frame, columns, mip_levels,
+                                wall_tops, wall_heights, wall_bottoms), screen_width)
+        del frame
+    
+    def _rasterize_columns(self, frame, columns, mip_levels, wall_tops, wall_heights, wall_bottoms, start, end):
+        """光栅化 [start, end) 范围内的屏幕列"""
+        screen_height = frame.shape[1]
+        tops = wall_tops[start:end]
+        bottoms = wall_bottoms[start:end]
+        
+        visible = bottoms > tops
+        if not visible.any():
             return
         
-        # 计算实体相对于玩家视角的角度
-        angle = math.atan2(dy, dx)
-        
-        # 规范化角度
-        angle %= 2 * math.pi
-        if angle < 0:
-            angle += 2 * math.pi
-        
-        # 计算玩家视角范围
-        player_angle = player.angle % (2 * math.pi)
-        left_angle = (player_angle - self.half_fov) % (2 * math.pi)
-        right_angle = (player_angle + self.half_fov) % (2 * math.pi)
+        # 只处理包含墙壁的行范围
+        row_start = max(0, int(tops[visible].min()))
+        row_end = min(screen_height, int(bottoms[visible].max()))
+        if row_end <= row_start:
+            return
         
-        # 检查实体是否在视野范围内
-        in_fov = False
-        if left_angle > right_angle:  # 视角跨越了0度
-            in_fov = angle >= left_angle or angle <= right_angle
+        # 每列只绘制 [顶部, 底部) 范围内的像素
+        rows = np.arange(row_start, row_end)
+        mask = (rows[None, :] >= tops[:, None]) & (rows[None, :] < bottoms[:, None])
+        
+        # 计算每个像素对应的纹理Y坐标
+        scale = (self.texture_height / np.maximum(wall_heights[start:end], 1)).astype(np.float32)
+        texture_y = (rows[None, :] - tops[:, None]).astype(np.float32) * scale[:, None]
+        texture_y = texture_y.astype(np.intp)
+        np.clip(texture_y, 0, self.texture_height - 1, out=texture_y)
+        texture_y >>= mip_levels[start:end, None]  # 换算到各列所用的mipmap等级
+        
+        # 一次性采样并写入帧缓冲区
+        target = frame[start:end, row_start:row_end]
+        if frame.ndim == 2:
+            pixels = np.take_along_axis(columns[start:end], texture_y, axis=1)
+            np.copyto(target, pixels, where=mask)
         else:
-            in_fov = angle >= left_angle and angle <= right_angle
-        
-        if not in_fov:
+            pixels = np.take_along_axis(columns[start:end], texture_y[:, :, None], axis=1)
+            np.copyto(target, pixels, where=mask[:, :, None])
+    
+    def _render_entities(self, screen, player, entities, center):
+        """按从远到近的顺序批量渲染所有实体（实体对象列表或EntityPool），并根据深度缓冲区逐列裁剪；
+        center为墙壁光线实际使用的视线角度，精灵按它投影到屏幕列，与墙壁对齐"""
+        if not len(entities):
             return
         
-        # 检查实体是否被墙壁遮挡
-        ray_angle = math.atan2(dy, dx)
-        ray_result = self._cast_ray(player.x, player.y, ray_angle)
+        screen_width, screen_height = screen.get_size()
         
-        if ray_result['distance'] < dist:
-            return  # 实体被墙壁遮挡
+        # 实体的位置和纹理索引（EntityPool通过空间哈希只取出最大深度以内的实体）
+        if hasattr(entities, 'within'):
+            nearby = entities.within(player.x, player.y, self.max_depth)
+            if not len(nearby):
+                return
+            entity_x, entity_y = entities.x[nearby], entities.y[nearby]
+            texture_indices = entities.texture_index[nearby]
+        else:
+            entity_x = np.array([entity.x for entity in entities], dtype=np.float64)
+            entity_y = np.array([entity.y for entity in entities], dtype=np.float64)
+            texture_indices = [entity.texture_index for entity in entities]
+        
+        # 实体沿视线方向的深度（与修正鱼眼效果后的深度缓冲区一致）
+        dx = entity_x - player.x
+        dy = entity_y - player.y
+        cos_p = math.cos(player.angle)
+        sin_p = math.sin(player.angle)
+        depth = dx * cos_p + dy * sin_p
+        
+        # 投影到屏幕列（与光线的角度分布保持一致，使用光线对齐后的视线角度）
+        cos_c = math.cos(center)
+        sin_c = math.sin(center)
+        angle = np.arctan2(dy * cos_c - dx * sin_c, dx * cos_c + dy * sin_c)
+        screen_x = (angle + self.half_fov) / self.fov * screen_width
+        
+        # 剔除玩家身后、太远、完全在屏幕外或所在单元格不可能被看见的实体
+        visible = (depth > self.sprite_near) & (np.hypot(dx, dy) <= self.max_depth)
+        visible &= np.abs(angle) < math.pi / 2
+        for i in np.flatnonzero(visible):
+            visible[i] = self.maze.cells_visible(player.x, player.y, entity_x[i], entity_y[i])
         
-        # 计算实体在屏幕上的位置
-        angle_diff = (player_angle - angle) % (2 * math.pi)
-        if angle_diff > math.pi:
-            angle_diff = 2 * math.pi - angle_diff
+        # 获取头部摇晃偏移量
+        bob_offset = int(player.get_head_bob_offset() * 10)
         
-        # 计算实体在屏幕上的X坐标
-        entity_x = screen_width // 2 + int(math.tan(angle_diff) * (screen_width // 2))
-        if abs(entity_x - screen_width // 2) > screen_width // 2:
-            return  # 实体在屏幕外
+        # 从远到近绘制，使近处的实体覆盖远处的实体
+        for i in np.argsort(-depth):
+            if visible[i]:
+                self._draw_sprite(screen, int(texture_indices[i]), float(depth[i]),
+                                  float(screen_x[i]), bob_offset)
+    
+    def _draw_sprite(self, screen, texture_index, depth, screen_x, bob_offset):
+        """绘制单个实体精灵，只绘制比该列墙壁更近的部分"""
+        screen_width, screen_height = screen.get_size()
         
-        # 计算实体大小
-        entity_size = int((screen_height * 0.5) / dist) if dist > 0 else screen_height
+        # 计算实体大小（限制最大尺寸，紧贴玩家的实体不会生成巨大的精灵）
+        entity_size = min(int((screen_height * 0.5) / depth), self.sprite_max_scale * screen_height)
+        entity_size = self.sprite_cache.quantize(entity_size)
         entity_width = entity_size
         entity_height = entity_size * 2  # 实体高度是宽度的两倍
         
-        # 获取头部摇晃偏移量
-        head_bob = player.get_head_bob_offset()
-        bob_offset = int(head_bob * 10)
-        
-        # 计算实体顶部和底部位置
-        entity_top = max(0, (screen_height // 2) - (entity_height // 2) + bob_offset)
-        
-        # 获取实体纹理
-        texture = self.entity_textures[entity.texture_index]
-        
-        # 缩放纹理
-        scaled_texture = pygame.transform.scale(texture, (entity_width, entity_height))
-        
-        # 应用雾效果
-        fog_factor = min(1.0, dist / self.max_depth)
-        for x in range(scaled_texture.get_width()):
-            for y in range(scaled_texture.get_height()):
-                color = scaled_texture.get_at((x, y))
-                if color.a > 0:  # 只处理非透明像素
-                    color = self._apply_fog(color, fog_factor)
-                    scaled_texture.set_at((x, y), color)
+        # 计算实体在屏幕上的范围
+        entity_left = int(screen_x) - entity_width // 2
+        entity_top = (screen_height // 2) - (entity_height // 2) + bob_offset
+        left = max(0, entity_left)
+        right = min(screen_width, entity_left + entity_width)
+        if right <= left:
+            return  # 实体在屏幕外
         
-        # 绘制实体
-        screen.blit(scaled_texture, (entity_x - entity_width // 2, entity_top))
+        # 找出实体在哪些列上没有被墙壁遮挡
+        if self.z_buffer is not None and len(self.z_buffer) == screen_width:
+            unoccluded = self.z_buffer[left:right] > depth
+        else:
+            unoccluded = np.ones(right - left, dtype=bool)
+        if not unoccluded.any():
+            return  # 实体被墙壁完全遮挡
+        
+        # 获取已缩放并应用雾效果的实体纹理，mipmap等级由尺寸决定
+        mip_level = int(self.entity_store.level_for(entity_height))
+        fog_level = int(self.fog.bucket(f'entities.{mip_level}', depth))
+        if entity_width > screen_width or entity_height > screen_height:
+            # 精灵超出屏幕时只生成屏幕内的部分（不放入缓存）
+            top = max(0, -entity_top)
+            clip = pygame.Rect(left - entity_left, top, right - left,
+                               min(entity_height, screen_height - entity_top) - top)
+            if clip.height <= 0:
+                return
+            scaled_texture = self._build_sprite_region(texture_index, mip_level, fog_level,
+                                                       entity_width, entity_height, clip)
+        else:
+            # 优先从缓存中获取完整的精灵
+            clip = pygame.Rect(0, 0, entity_width, entity_height)
+            key = (texture_index, entity_size, fog_level)
+            scaled_texture = self.sprite_cache.get(
+                key, lambda: self._build_sprite(texture_index, mip_level, fog_level, entity_width, entity_height))
+        
+        # 把连续的可见列合并为若干段，每段只需一次blit
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], unoccluded.view(np.int8), [0]))))
+        for start, end in zip(edges[::2], edges[1::2]):
+            column = left + int(start)
+            area = pygame.Rect(column - entity_left - clip.left, 0, int(end - start), clip.height)
+            screen.blit(scaled_texture, (column, entity_top + clip.top), area)
+    
+    def render_entity(self, screen, player, entity):
+        """渲染单个实体（使用上一次渲染墙壁时的深度缓冲区进行遮挡）"""
+        center = self.view_angle if self.view_angle is not None else player.angle
+        self._render_entities(screen, player, [entity], center)
+    
+    def _ray_directions(self, angle):
+        """利用预计算的偏移正余弦表得到所有光线的方向向量"""
+        cos_p = math.cos(angle)
+        sin_p = math.sin(angle)
+        cos_a = cos_p * self.ray_cos - sin_p * self.ray_sin
+        sin_a = sin_p * self.ray_cos + cos_p * self.ray_sin
+        return cos_a, sin_a
     
-    def _cast_ray(self, x, y, angle):
-        """投射单个光线并返回结果"""
-        # 初始化结果
-        result = {
-            'distance': float('inf'),
-            'texture_index': 0,
-            'texture_pos': 0
+    def _cast_coherent(self, x, y, angle):
+        """投射所有光线并存入self.ray_casts，返回实际使用的视线角度"""
+        # 光线角度对齐到以delta_angle为间隔的全局网格上，这样原地旋转时上一帧的光线
+        # 只是整体平移了若干列：位姿不变时直接复用，只旋转时只投射新露出的列
+        num = self.num_rays
+        base_k = round((angle - self.half_fov) / self.delta_angle)
+        center = base_k * self.delta_angle + self.half_fov
+        
+        shift = None
+        if self.ray_cache_pose is not None and self.ray_casts is not None:
+            cached_x, cached_y, cached_k, cached_num = self.ray_cache_pose
+            if (cached_x, cached_y, cached_num) == (x, y, num):
+                shift = base_k - cached_k
+        
+        if shift == 0:
+            self.ray_cache_hits += 1
+            self.profiler.count('ray_cache.hit')
+            return center
+        
+        cos_a, sin_a = self._ray_directions(center)
+        if shift is not None and abs(shift) < num:
+            # 第i条新光线就是第i+shift条旧光线，只投射两端新露出的列
+            if shift > 0:
+                fresh = self._cast_tiled(x, y, cos_a[num - shift:], sin_a[num - shift:])
+                self.ray_casts = {key: np.concatenate([values[shift:], fresh[key]])
+                                  for key, values in self.ray_casts.items()}
+            else:
+                fresh = self._cast_tiled(x, y, cos_a[:-shift], sin_a[:-shift])
+                self.ray_casts = {key: np.concatenate([fresh[key], values[:num + shift]])
+                                  for key, values in self.ray_casts.items()}
+            cast = abs(shift)
+            self.ray_cache_partial += 1
+            self.profiler.count('ray_cache.partial')
+        else:
+            self.ray_casts = self._cast_tiled(x, y, cos_a, sin_a)
+            cast = num
+            self.ray_cache_misses += 1
+            self.profiler.count('ray_cache.miss')
+        
+        self.rays_cast += cast
+        self.profiler.count('rays_cast', cast)
+        self.ray_cache_pose = (x, y, base_k, num)
+        return center
+    
+    def ray_cache_stats(self):
+        """获取帧间光线复用的统计信息"""
+        frames = self.ray_cache_hits + self.ray_cache_partial + self.ray_cache_misses
+        return {
+            'hits': self.ray_cache_hits,
+            'partial': self.ray_cache_partial,
+            'misses': self.ray_cache_misses,
+            'hit_rate': (self.ray_cache_hits + self.ray_cache_partial) / frames if frames else 0.0,
+            'rays_cast': self.rays_cast,
+            'rays_per_frame': self.rays_cast / frames if frames else 0.0
         }
-        
-        # 计算光线方向向量
-        cos_a = math.cos(angle)
-        sin_a = math.sin(angle)
-        
-        # 水平相交检测
-        y_hor = int(y) + (1 if sin_a > 0 else 0)
-        dy = 1 if sin_a > 0 else -1
-        
-        depth_hor = (y_hor - y) / sin_a if sin_a != 0 else float('inf')
-        x_hor = x + depth_hor * cos_a
-        
-        delta_depth = dy / sin_a if sin_a != 0 else float('inf')
-        dx = delta_depth * cos_a
-        
-        for _ in range(self.max_depth):
-            tile_x, tile_y = int(x_hor), int(y_hor)
-            if 0 <= tile_x < self.maze.width and 0 <= tile_y < self.maze.height:
-                if self.maze.is_wall(tile_x, tile_y):
-                    texture_pos = x_hor % 1
-                    if sin_a < 0:
-                        texture_pos = 1 - texture_pos
-                    
-                    result['distance'] = depth_hor
-                    result['texture_index'] = self.maze.get_wall_texture_index(tile_x, tile_y)
-                    result['texture_pos'] = texture_pos
-                    break
-            
-            x_hor += dx
-            y_hor += dy
-            depth_hor += delta_depth
+    
+    def _cast_tiled(self, x, y, cos_a, sin_a):
+        """把光线分块后（可能并行地）投射，并按原顺序拼接结果"""
+        results = self._run_tiles(
+            lambda start, end: self._cast_rays(x, y, cos_a[start:end], sin_a[start:end]), len(cos_a))
+        if len(results) == 1:
+            return results[0]
+        return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+    
+    def _cast_rays(self, x, y, cos_a, sin_a):
+        """使用DDA算法同时投射一组光线，返回距离、纹理索引和纹理偏移数组"""
+        num = cos_a.shape[0]
+        grid = self.grid_array
+        height, width = grid.shape
+        
+        # 初始化结果（未命中的光线距离为无穷大）
+        distance = np.full(num, np.inf)
+        texture_index = np.zeros(num, dtype=np.intp)
+        texture_pos = np.zeros(num)
+        
+        # 避免除以零
+        cos_a = np.where(np.abs(cos_a) < 1e-12, 1e-12, cos_a)
+        sin_a = np.where(np.abs(sin_a) < 1e-12, 1e-12, sin_a)
+        
+        # 光线穿过一个单元格所需的距离
+        delta_x = np.abs(1.0 / cos_a)
+        delta_y = np.abs(1.0 / sin_a)
+        
+        # 步进方向以及到第一条网格线的距离
+        map_x = np.full(num, int(x), dtype=np.intp)
+        map_y = np.full(num, int(y), dtype=np.intp)
+        step_x = np.where(cos_a > 0, 1, -1)
+        step_y = np.where(sin_a > 0, 1, -1)
+        side_x = np.where(cos_a > 0, map_x + 1 - x, x - map_x) * delta_x
+        side_y = np.where(sin_a > 0, map_y + 1 - y, y - map_y) * delta_y
+        
+        # 仍在传播的光线下标
+        active = np.arange(num)
+        
+        # 长度为max_depth的光线最多穿过约2*max_depth个单元格
+        for _ in range(int(2 * self.max_depth) + 2):
+            # 选择先到达的网格线（True表示穿过垂直网格线）
+            vertical = side_x < side_y
+            dist = np.where(vertical, side_x, side_y)
+            map_x = np.where(vertical, map_x + step_x, map_x)
+            map_y = np.where(vertical, map_y, map_y + step_y)
+            side_x = np.where(vertical, side_x + delta_x, side_x)
+            side_y = np.where(vertical, side_y, side_y + delta_y)
             
-            if depth_hor > self.max_depth:
-                break
-        
-        # 垂直相交检测
-        x_vert = int(x) + (1 if cos_a > 0 else 0)
-        dx = 1 if cos_a > 0 else -1
-        
-        depth_vert = (x_vert - x) / cos_a if cos_a != 0 else float('inf')
-        y_vert = y + depth_vert * sin_a
-        
-        delta_depth = dx / cos_a if cos_a != 0 else float('inf')
-        dy = delta_depth * sin_a
-        
-        for _ in range(self.max_depth):
-            tile_x, tile_y = int(x_vert), int(y_vert)
-            if 0 <= tile_x < self.maze.width and 0 <= tile_y < self.maze.height:
-                if self.maze.is_wall(tile_x, tile_y):
-                    texture_pos = y_vert % 1
-                    if cos_a > 0:
-                        texture_pos = 1 - texture_pos
-                    
-                    if depth_vert < result['distance']:
-                        result['distance'] = depth_vert
-                        result['texture_index'] = self.maze.get_wall_texture_index(tile_x, tile_y)
-                        result['texture_pos'] = texture_pos
-                    break
+            # 迷宫外部视为墙
+            inside = (map_x >= 0) & (map_x < width) & (map_y >= 0) & (map_y < height)
+            cell_x = np.clip(map_x, 0, width - 1)
+            cell_y = np.clip(map_y, 0, height - 1)
+            hit = ~inside | (grid[cell_y, cell_x] != 0)
+            too_far = dist > self.max_depth
             
-            x_vert += dx
-            y_vert += dy
-            depth_vert += delta_depth
+            found = hit & ~too_far
+            if found.any():
+                rays = active[found]
+                d = dist[found]
+                distance[rays] = d
+                texture_index[rays] = np.where(inside[found],
+                                               self.texture_index_array[cell_y[found], cell_x[found]], 0)
+                
+                # 计算纹理X坐标，与墙面朝向保持一致
+                ray_cos = cos_a[rays]
+                ray_sin = sin_a[rays]
+                hit_vertical = vertical[found]
+                pos = np.where(hit_vertical, (y + d * ray_sin) % 1, (x + d * ray_cos) % 1)
+                flip = np.where(hit_vertical, ray_cos > 0, ray_sin < 0)
+                texture_pos[rays] = np.where(flip, 1 - pos, pos)
             
-            if depth_vert > self.max_depth:
-                break
-        
-        return result
+            # 移除已经命中或超出最大深度的光线
+            keep = ~(hit | too_far)
+            if not keep.all():
+                active = active[keep]
+                if active.size == 0:
+                    break
+                map_x, map_y = map_x[keep], map_y[keep]
+                side_x, side_y = side_x[keep], side_y[keep]
+                step_x, step_y = step_x[keep], step_y[keep]
+                delta_x, delta_y = delta_x[keep], delta_y[keep]
+        
+        return {
+            'distance': distance,
+            'texture_index': texture_index,
+            'texture_pos': texture_pos
+        }
     
-    def _apply_fog(self, color, fog_factor):
-        """应用雾效果"""
-        r, g, b = color[:3]
-        fog_color = (50, 45, 30)  # 雾的颜色（暗黄色）
-        
-        r = int(r * (1 - fog_factor) + fog_color[0] * fog_factor)
-        g = int(g * (1 - fog_factor) + fog_color[1] * fog_factor)
-        b = int(b * (1 - fog_factor) + fog_color[2] * fog_factor)
-        
-        if len(color) > 3:
-            return (r, g, b, color[3])
-        else:
-            return (r, g, b)
\ No newline at end of file
+    def _build_sprite(self, texture_index, mip_level, fog_level, width, height):
+        """从指定mipmap等级生成指定雾等级和尺寸的实体精灵"""
+        texture = self._array_to_surface(self.fog.tables[f'entities.{mip_level}'][texture_index, fog_level])
+        return pygame.transform.scale(texture, (width, height))
+    
+    def _build_sprite_region(self, texture_index, mip_level, fog_level, width, height, clip):
+        """只生成缩放到 (width, height) 的实体精灵中clip范围内的部分（最近邻采样）"""
+        rgba = self.fog.tables[f'entities.{mip_level}'][texture_index, fog_level]
+        source_x = np.arange(clip.left, clip.right) * rgba.shape[0] // width
+        source_y = np.arange(clip.top, clip.bottom) * rgba.shape[1] // height
+        return self._array_to_surface(rgba[source_x[:, None], source_y])
+    
+    def _surface_to_array(self, surface):
+        """把带透明度的表面转换为形状为 (宽, 高, 4) 的RGBA数组"""
+        rgba = np.empty(surface.get_size() + (4,), dtype=np.uint8)
+        rgba[..., :3] = pygame.surfarray.array3d(surface)
+        rgba[..., 3] = pygame.surfarray.array_alpha(surface)
+        return rgba
+    
+    def _array_to_surface(self, rgba):
+        """把形状为 (宽, 高, 4) 的RGBA数组转换为带透明度的表面"""
+        surface = pygame.Surface(rgba.shape[:2], pygame.SRCALPHA)
+        pygame.surfarray.blit_array(surface, TextureStore.map_colors(surface, rgba[..., :3]))
+        pygame.surfarray.pixels_alpha(surface)[...] = rgba[..., 3]
+        return surface
\ No newline at end of file
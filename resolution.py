@@ -0,0 +1,55 @@
+from collections import deque
+
+class ResolutionScaler:
+    """根据帧时间预算动态调整内部渲染分辨率"""
+    
+    def __init__(self, target_ms=12.0, min_scale=0.4, max_scale=1.0, step=0.05,
+                 window=10, history_size=300):
+        self.target_ms = target_ms  # 每帧渲染的目标耗时（毫秒）
+        self.min_scale = min_scale  # 内部分辨率相对窗口的最小比例
+        self.max_scale = max_scale  # 内部分辨率相对窗口的最大比例
+        self.step = step  # 每次调整的比例步长
+        self.window = window  # 每隔多少帧根据平均耗时调整一次
+        
+        self.scale = max_scale
+        self.history = deque(maxlen=history_size)  # 最近若干帧的 (耗时, 比例)
+        self.frames_since_change = 0
+    
+    def render_size(self, screen_size):
+        """计算当前比例下的内部渲染分辨率"""
+        screen_width, screen_height = screen_size
+        return (max(1, int(screen_width * self.scale)), max(1, int(screen_height * self.scale)))
+    
+    def record(self, frame_ms):
+        """记录一帧的耗时，并在需要时调整比例"""
+        self.history.append((frame_ms, self.scale))
+        self.frames_since_change += 1
+        if self.frames_since_change < self.window:
+            return
+        
+        # 只根据当前比例下的最近几帧做判断，避免来回抖动
+        average = self.average_ms(self.window)
+        if average > self.target_ms and self.scale > self.min_scale:
+            self.scale = max(self.min_scale, round(self.scale - self.step, 4))
+            self.frames_since_change = 0
+        elif average < self.target_ms * 0.7 and self.scale < self.max_scale:
+            self.scale = min(self.max_scale, round(self.scale + self.step, 4))
+            self.frames_since_change = 0
+    
+    def average_ms(self, frames=None):
+        """最近若干帧的平均耗时"""
+        if not self.history:
+            return 0.0
+        recent = list(self.history)[-frames:] if frames else self.history
+        return sum(frame_ms for frame_ms, _ in recent) / len(recent)
+    
+    def stats(self):
+        """获取当前比例和帧时间统计"""
+        frame_times = [frame_ms for frame_ms, _ in self.history]
+        return {
+            'scale': self.scale,
+            'target_ms': self.target_ms,
+            'average_ms': self.average_ms(),
+            'max_ms': max(frame_times) if frame_times else 0.0,
+            'frames': len(frame_times)
+        }
\ No newline at end of file
@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+
+class SpatialHash:
+    """按迷宫单元格分桶的均匀网格空间哈希：每个桶记录位于该单元格内的对象序号，
+    对象跨越单元格时才移动桶，范围查询只访问覆盖查询圆的单元格"""
+    
+    def __init__(self, capacity=64):
+        # 单元格坐标 -> 位于其中的对象序号集合（空桶会被删除，因此桶数等于被占用的单元格数）
+        self.buckets = {}
+        
+        # 每个对象最后一次记录的坐标及其所在单元格
+        self.x = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.float64)
+        self.cell_x = np.zeros(capacity, dtype=np.int64)
+        self.cell_y = np.zeros(capacity, dtype=np.int64)
+        self.count = 0  # 对象数量（序号为0到count-1）
+        
+        # 对象跨越单元格（更换桶）的次数
+        self.relinks = 0
+    
+    def insert(self, index, x, y):
+        """加入一个对象（序号必须按顺序分配）"""
+        if index >= len(self.x):
+            capacity = max(index + 1, len(self.x) * 2)
+            for name in ('x', 'y', 'cell_x', 'cell_y'):
+                old = getattr(self, name)
+                array = np.zeros(capacity, dtype=old.dtype)
+                array[:len(old)] = old
+                setattr(self, name, array)
+        self.count = max(self.count, index + 1)
+        self.x[index] = x
+        self.y[index] = y
+        self.cell_x[index] = math.floor(x)
+        self.cell_y[index] = math.floor(y)
+        self.buckets.setdefault((math.floor(x), math.floor(y)), set()).add(index)
+    
+    def move(self, indices, x, y):
+        """更新一组对象的坐标（数组），只有所在单元格改变的对象才会更换桶"""
+        indices = np.asarray(indices, dtype=np.intp)
+        if not len(indices):
+            return
+        cell_x = np.floor(x).astype(np.int64)
+        cell_y = np.floor(y).astype(np.int64)
+        changed = (cell_x != self.cell_x[indices]) | (cell_y != self.cell_y[indices])
+        if changed.any():
+            for i, old_x, old_y, new_x, new_y in zip(indices[changed].tolist(),
+                                                     self.cell_x[indices[changed]].tolist(),
+                                                     self.cell_y[indices[changed]].tolist(),
+                                                     cell_x[changed].tolist(), cell_y[changed].tolist()):
+                bucket = self.buckets[(old_x, old_y)]
+                bucket.discard(i)
+                if not bucket:
+                    del self.buckets[(old_x, old_y)]
+                self.buckets.setdefault((new_x, new_y), set()).add(i)
+            self.relinks += int(np.count_nonzero(changed))
+            self.cell_x[indices] = cell_x
+            self.cell_y[indices] = cell_y
+        self.x[indices] = x
+        self.y[indices] = y
+    
+    def in_cell(self, cell_x, cell_y):
+        """位于单元格内的对象序号数组（升序）"""
+        bucket = self.buckets.get((cell_x, cell_y))
+        if not bucket:
+            return np.zeros(0, dtype=np.intp)
+        return np.array(sorted(bucket), dtype=np.intp)
+    
+    def within(self, x, y, radius):
+        """与点 (x, y) 的距离小于radius的对象序号数组（升序）"""
+        min_x, max_x = math.floor(x - radius), math.floor(x + radius)
+        min_y, max_y = math.floor(y - radius), math.floor(y + radius)
+        
+        # 查询范围内的单元格比被占用的单元格还多时，直接遍历所有桶
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > len(self.buckets):
+            cells = [cell for cell in self.buckets
+                     if min_x <= cell[0] <= max_x and min_y <= cell[1] <= max_y]
+        else:
+            cells = [(cell_x, cell_y) for cell_y in range(min_y, max_y + 1)
+                     for cell_x in range(min_x, max_x + 1)]
+        
+        candidates = []
+        for cell in cells:
+            bucket = self.buckets.get(cell)
+            if bucket:
+                candidates.extend(bucket)
+        if not candidates:
+            return np.zeros(0, dtype=np.intp)
+        candidates = np.array(sorted(candidates), dtype=np.intp)
+        inside = np.hypot(self.x[candidates] - x, self.y[candidates] - y) < radius
+        return candidates[inside]
+    
+    def stats(self):
+        """获取空间哈希的统计信息"""
+        return {
+            'objects': self.count,
+            'buckets': len(self.buckets),
+            'max_bucket': max((len(bucket) for bucket in self.buckets.values()), default=0),
+            'relinks': self.relinks
+        }
\ No newline at end of file
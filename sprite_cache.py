@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+class SpriteCache:
+    """已缩放并应用雾效果的实体精灵缓存，按最近最少使用（LRU）淘汰"""
+    
+    def __init__(self, max_entries=128, max_bytes=32 * 1024 * 1024, size_step=2):
+        self.max_entries = max_entries  # 最多缓存的精灵数量
+        self.max_bytes = max_bytes  # 缓存精灵占用的内存上限
+        self.size_step = size_step  # 精灵尺寸的量化步长（像素）
+        
+        # 键为 (纹理索引, 量化尺寸, 雾等级)，值为缩放后的表面
+        self.entries = OrderedDict()
+        self.bytes_used = 0
+        
+        # 命中统计
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def quantize(self, size):
+        """把精灵尺寸量化到步长的整数倍，使相近距离的实体共用同一个缓存项"""
+        return max(self.size_step, (size + self.size_step // 2) // self.size_step * self.size_step)
+    
+    def get(self, key, build):
+        """获取缓存的精灵，未命中时调用build()生成并加入缓存（单个就超过内存上限的精灵直接返回，不缓存）"""
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+        
+        self.misses += 1
+        surface = build()
+        size = self._surface_bytes(surface)
+        if size > self.max_bytes:
+            return surface
+        self.entries[key] = surface
+        self.bytes_used += size
+        self._evict()
+        return surface
+    
+    def _evict(self):
+        """淘汰最久未使用的精灵，直到数量和内存都不超过上限"""
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes_used > self.max_bytes):
+            _, surface = self.entries.popitem(last=False)
+            self.bytes_used -= self._surface_bytes(surface)
+            self.evictions += 1
+    
+    def _surface_bytes(self, surface):
+        """估算表面占用的内存"""
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+    
+    def clear(self):
+        """清空缓存"""
+        self.entries.clear()
+        self.bytes_used = 0
+    
+    def stats(self):
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self.entries),
+            'bytes': self.bytes_used
+        }
\ No newline at end of file
@@ -0,0 +1,57 @@
+import numpy as np
+
+class TextureStore:
+    """以NumPy数组保存的一组同尺寸纹理及其mipmap链"""
+    
+    def __init__(self, textures, min_size=1):
+        # 形状为 (纹理数, 宽, 高, 通道) 的连续数组，每个纹理列（固定x）在内存中是连续的
+        textures = np.ascontiguousarray(textures, dtype=np.uint8)
+        self.count = textures.shape[0]  # 纹理数量
+        self.width = textures.shape[1]  # 第0级纹理的宽度
+        self.height = textures.shape[2]  # 第0级纹理的高度
+        
+        # 第i级的宽高是第0级的 1/2^i，直到宽或高小于 2*min_size 为止
+        self.levels = [textures]
+        while min(self.levels[-1].shape[1:3]) >= 2 * min_size:
+            self.levels.append(self._downsample(self.levels[-1]))
+    
+    def _downsample(self, textures):
+        """用2x2盒式滤波把纹理缩小一半（有透明度通道时按透明度加权平均颜色）"""
+        width = textures.shape[1] // 2
+        height = textures.shape[2] // 2
+        blocks = textures[:, :width * 2, :height * 2].astype(np.float32)
+        blocks = blocks.reshape(textures.shape[0], width, 2, height, 2, textures.shape[3])
+        
+        if textures.shape[3] > 3:
+            # 避免完全透明像素的颜色渗入边缘
+            alpha = blocks[..., 3:]
+            weight = alpha.sum(axis=(2, 4))
+            rgb = (blocks[..., :3] * alpha).sum(axis=(2, 4)) / np.maximum(weight, 1)
+            result = np.concatenate([rgb, weight / 4], axis=-1)
+        else:
+            result = blocks.mean(axis=(2, 4))
+        return np.ascontiguousarray(np.round(result).astype(np.uint8))
+    
+    @staticmethod
+    def map_colors(surface, colors):
+        """把 (..., 3) 的RGB数组打包成与32位表面像素格式一致的整数"""
+        colors = colors.astype(np.uint32)
+        r_shift, g_shift, b_shift, _ = surface.get_shifts()
+        alpha_mask = surface.get_masks()[3]
+        return ((colors[..., 0] << r_shift) | (colors[..., 1] << g_shift) |
+                (colors[..., 2] << b_shift) | np.uint32(alpha_mask))
+    
+    def level_for(self, projected_height):
+        """根据投影到屏幕上的高度（标量或数组）选择mipmap等级"""
+        ratio = self.height / np.maximum(np.asarray(projected_height, dtype=np.float64), 1)
+        level = np.floor(np.log2(np.maximum(ratio, 1))).astype(np.intp)
+        return np.minimum(level, len(self.levels) - 1)
+    
+    def level_size(self, level):
+        """获取指定等级纹理的 (宽, 高)"""
+        return self.levels[level].shape[1:3]
+    
+    @property
+    def memory_bytes(self):
+        """整条mipmap链占用的内存（字节）"""
+        return sum(level.nbytes for level in self.levels)
\ No newline at end of file